@@ -5,11 +5,13 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from flask import Flask, request
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from werkzeug.serving import WSGIRequestHandler
 from config import Config
 from utils.logger import get_logger, log_security_event, sanitize_data
 import re
+import orjson
 from routes.auth import auth_bp
 from routes.chat import chat_bp
 from routes.document import document_bp
@@ -25,7 +27,18 @@ logger = get_logger(__name__)
 # Validate configuration
 Config.validate()
 
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider that parses request bodies with orjson.
+    
+    Only loads is swapped: dumps keeps Flask's default encoding so existing
+    jsonify output (datetime formatting, key order) is unchanged.
+    """
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 
 # Custom request handler to sanitize tokens in access logs
 class SanitizedRequestHandler(WSGIRequestHandler):
@@ -29,6 +29,12 @@ class Config:
     PERPLEXITY_API_KEY = os.getenv('PERPLEXITY_API_KEY')  # For Stage 1 AI (content generation)
     MONGODB_URI = os.getenv('MONGODB_URI')
     
+    # MongoDB connection pool (one shared client per process)
+    MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', 50))
+    MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', 5))
+    MONGO_MAX_IDLE_TIME_MS = int(os.getenv('MONGO_MAX_IDLE_TIME_MS', 60000))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', 2500))
+    
     # Auth0 Configuration - No defaults, fail fast if missing
     AUTH0_DOMAIN = os.getenv('AUTH0_DOMAIN')  # No default!
     AUTH0_CLIENT_ID = os.getenv('AUTH0_CLIENT_ID')  # No default!
@@ -52,7 +58,21 @@ class Config:
     REDIS_TTL_DOCUMENTS = int(os.getenv('REDIS_TTL_DOCUMENTS', 300))  # 5 min
     REDIS_TTL_METADATA = int(os.getenv('REDIS_TTL_METADATA', 600))  # 10 min
     REDIS_TTL_VERSION = int(os.getenv('REDIS_TTL_VERSION', 60))  # 1 min
-    
+
+    # Web highlight preview image generation
+    PREVIEW_RESAMPLE_FILTER = os.getenv('PREVIEW_RESAMPLE_FILTER', 'LANCZOS')  # Any PIL.Image.Resampling name
+    PREVIEW_REDUCING_GAP = float(os.getenv('PREVIEW_REDUCING_GAP', 2.0))  # Box-reduce until within this factor of target
+    MAX_SCREENSHOT_B64 = int(os.getenv('MAX_SCREENSHOT_B64', 16 * 1024 * 1024))  # 16 MB of base64 (~12 MB image)
+    MAX_HIGHLIGHT_REQUEST_BYTES = int(os.getenv('MAX_HIGHLIGHT_REQUEST_BYTES', 17 * 1024 * 1024))  # Screenshot + highlight fields
+    MAX_PENDING_PREVIEWS = int(os.getenv('MAX_PENDING_PREVIEWS', 16))  # Queued + running preview jobs per process
+
+    # Highlight extraction (PDF/image uploads): max concurrent extraction jobs per process
+    EXTRACTION_CONCURRENCY = int(os.getenv('EXTRACTION_CONCURRENCY', 4))
+    MAX_BULK_UPLOAD_FILES = int(os.getenv('MAX_BULK_UPLOAD_FILES', 20))  # Files per /bulk upload
+
+    # Document delta sync limits (reject oversized patch/delta payloads before applying)
+    MAX_PATCH_BYTES = int(os.getenv('MAX_PATCH_BYTES', 512 * 1024))  # 512 KB
+
     # Rate Limiting Configuration
     RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
     RATE_LIMIT_DEFAULT_PER_MINUTE = int(os.getenv('RATE_LIMIT_DEFAULT_PER_MINUTE', 100))
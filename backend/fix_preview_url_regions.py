@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+One-off backfill: rewrite stored highlight preview_image_url values to the configured S3 region.
+
+New previews are stored with the correct region (S3Service.upload_highlight_image), so the
+API no longer fixes URLs on read. Run this once from the backend directory to migrate
+highlights saved before that change:
+
+    python fix_preview_url_regions.py
+"""
+from pymongo import UpdateOne
+
+from models.database import Database
+from services.s3_service import S3Service
+
+
+def main():
+    collection = Database.get_collection('highlights')
+    cursor = collection.find(
+        {'highlights.preview_image_url': {'$nin': [None, '']}},
+        {'highlights.highlight_id': 1, 'highlights.preview_image_url': 1}
+    )
+
+    operations = []
+    for doc in cursor:
+        for h in doc.get('highlights', []):
+            url = h.get('preview_image_url')
+            fixed_url = S3Service.fix_s3_url_region(url)
+            if url and fixed_url != url and h.get('highlight_id'):
+                operations.append(UpdateOne(
+                    {'_id': doc['_id']},
+                    {'$set': {'highlights.$[h].preview_image_url': fixed_url}},
+                    array_filters=[{'h.highlight_id': h.get('highlight_id')}]
+                ))
+
+    if operations:
+        result = collection.bulk_write(operations, ordered=False)
+        print(f"Updated {result.modified_count} preview URLs")
+    else:
+        print("All preview URLs already use the configured region")
+
+
+if __name__ == '__main__':
+    main()
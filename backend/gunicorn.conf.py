@@ -0,0 +1,35 @@
+"""
+Gunicorn configuration for production.
+
+Run from the backend directory:
+    gunicorn -c gunicorn.conf.py app:app
+
+Uses gthread workers by default: each request (and each open SSE stream) holds a real
+OS thread, and the background preview/extraction pools run on real threads too, so
+CPU-bound work (PIL decode/resize/encode, PDF parsing) releases the GIL in C code
+instead of stalling the worker.
+
+GUNICORN_WORKER_CLASS=gevent is supported for deployments dominated by idle SSE
+connections, with a tradeoff: gevent monkey-patches threading, so the preview and
+extraction executors become greenlets on the worker's single OS thread and every
+preview or extraction blocks all other requests in that worker while it runs. The
+gevent worker patches the standard library before the app (and pymongo) is imported,
+so preload_app must stay off.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', f"0.0.0.0:{os.getenv('PORT', '5001')}")
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', 32))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 500))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+preload_app = False
+
+# Each worker holds one MongoClient; size its pool to the number of concurrent
+# requests (threads, or greenlets under gevent) so requests don't queue on
+# waitQueueTimeoutMS (workers inherit this env)
+os.environ.setdefault(
+    'MONGO_MAX_POOL_SIZE', str(worker_connections if worker_class == 'gevent' else threads)
+)
@@ -1,6 +1,8 @@
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure, DuplicateKeyError
+import gridfs
 from datetime import datetime
+import heapq
 import uuid
 import os
 import sys
@@ -13,16 +15,28 @@ from utils.logger import get_logger, log_error
 
 logger = get_logger(__name__)
 
+# pdf_documents fields that are never needed for metadata reads: legacy inline file data
+# (base64, superseded by GridFS file_id) and legacy embedded highlights (highlights now live in the highlights collection)
+PDF_METADATA_PROJECTION = {'file_data': 0, 'highlights': 0}
+
 class Database:
     _client = None
     _db = None
+    _collections = {}
+    _fs = None
     
     @classmethod
     def connect(cls):
         """Initialize MongoDB connection"""
         if cls._client is None:
             try:
-                cls._client = MongoClient(Config.MONGODB_URI)
+                cls._client = MongoClient(
+                    Config.MONGODB_URI,
+                    maxPoolSize=Config.MONGO_MAX_POOL_SIZE,
+                    minPoolSize=Config.MONGO_MIN_POOL_SIZE,
+                    maxIdleTimeMS=Config.MONGO_MAX_IDLE_TIME_MS,
+                    waitQueueTimeoutMS=Config.MONGO_WAIT_QUEUE_TIMEOUT_MS
+                )
                 cls._db = cls._client['research_platform']
                 # Test connection
                 cls._client.admin.command('ping')
@@ -39,6 +53,22 @@ class Database:
             cls.connect()
         return cls._db
     
+    @classmethod
+    def get_collection(cls, name):
+        """Get a collection handle, reused across calls (db.<name> builds a new Collection each time)"""
+        collection = cls._collections.get(name)
+        if collection is None:
+            collection = cls.get_db()[name]
+            cls._collections[name] = collection
+        return collection
+    
+    @classmethod
+    def get_fs(cls):
+        """Get the GridFS handle for stored document files, reused across calls"""
+        if cls._fs is None:
+            cls._fs = gridfs.GridFS(cls.get_db())
+        return cls._fs
+    
     @classmethod
     def close(cls):
         """Close MongoDB connection"""
@@ -46,6 +76,8 @@ class Database:
             cls._client.close()
             cls._client = None
             cls._db = None
+            cls._collections = {}
+            cls._fs = None
 
 class UserModel:
     @staticmethod
@@ -209,7 +241,7 @@ class ProjectModel:
     @staticmethod
     def create_project(user_id, project_name, description=None):
         """Create a new project"""
-        db = Database.get_db()
+        collection = Database.get_collection('projects')
         project_id = str(uuid.uuid4())
         project = {
             'user_id': user_id,
@@ -219,20 +251,26 @@ class ProjectModel:
             'created_at': datetime.utcnow(),
             'updated_at': datetime.utcnow()
         }
-        db.projects.insert_one(project)
+        collection.insert_one(project)
         return project_id
     
     @staticmethod
     def get_project(project_id):
         """Get project by project_id"""
-        db = Database.get_db()
-        return db.projects.find_one({'project_id': project_id})
+        collection = Database.get_collection('projects')
+        return collection.find_one({'project_id': project_id})
+    
+    @staticmethod
+    def project_belongs_to(project_id, user_id):
+        """Check that a project exists and is owned by user_id (existence check, no document fetch)"""
+        collection = Database.get_collection('projects')
+        return collection.count_documents({'project_id': project_id, 'user_id': user_id}, limit=1) == 1
     
     @staticmethod
     def get_all_projects(user_id):
         """Get all projects for a user, sorted by updated_at descending"""
-        db = Database.get_db()
-        projects = list(db.projects.find(
+        collection = Database.get_collection('projects')
+        projects = list(collection.find(
             {'user_id': user_id}
         ).sort('updated_at', -1))
         return projects
@@ -240,7 +278,7 @@ class ProjectModel:
     @staticmethod
     def update_project(project_id, project_name=None, description=None):
         """Update project"""
-        db = Database.get_db()
+        collection = Database.get_collection('projects')
         update_data = {'updated_at': datetime.utcnow()}
         
         if project_name is not None:
@@ -248,7 +286,7 @@ class ProjectModel:
         if description is not None:
             update_data['description'] = description
         
-        result = db.projects.update_one(
+        result = collection.update_one(
             {'project_id': project_id},
             {'$set': update_data}
         )
@@ -257,8 +295,8 @@ class ProjectModel:
     @staticmethod
     def delete_project(project_id):
         """Delete project"""
-        db = Database.get_db()
-        result = db.projects.delete_one({'project_id': project_id})
+        collection = Database.get_collection('projects')
+        result = collection.delete_one({'project_id': project_id})
         return result.deleted_count > 0
 
 class ChatSessionModel:
@@ -660,7 +698,7 @@ class ResearchDocumentModel:
         )
     
     @staticmethod
-    def apply_delta(document_id, patches_text, expected_version):
+    def apply_delta(document_id, patches_text, expected_version, delta_text=None):
         """
         Apply delta patches to document content using diff-match-patch.
         
@@ -668,9 +706,10 @@ class ResearchDocumentModel:
             document_id: The document ID
             patches_text: Patch text from diff-match-patch (frontend)
             expected_version: The version the client expects (for optimistic locking)
+            delta_text: Optional compact delta from diff_toDelta; preferred over patches_text when present
         
         Returns:
-            dict with 'success', 'new_version', 'new_content_length', 'error'
+            dict with 'success', 'new_version', 'new_content_length', 'new_content', 'error'
         """
         from diff_match_patch import diff_match_patch
         
@@ -694,8 +733,14 @@ class ResearchDocumentModel:
         # Apply patches
         dmp = diff_match_patch()
         try:
-            patches = dmp.patch_fromText(patches_text)
-            new_content, results = dmp.patch_apply(patches, current_content)
+            if delta_text:
+                # Delta is an exact edit script against the current content - no fuzzy matching needed
+                diffs = dmp.diff_fromDelta(current_content, delta_text)
+                new_content = dmp.diff_text2(diffs)
+                results = [True]
+            else:
+                patches = dmp.patch_fromText(patches_text)
+                new_content, results = dmp.patch_apply(patches, current_content)
             
             # Check if all patches applied successfully
             if not all(results):
@@ -719,6 +764,7 @@ class ResearchDocumentModel:
                 'success': True,
                 'new_version': new_version,
                 'new_content_length': len(new_content),
+                'new_content': new_content,
                 'patches_applied': results
             }
             
@@ -936,7 +982,7 @@ class HighlightModel:
     def save_highlight(user_id, project_id, source_url, page_title, highlight_text, note=None, tags=None, preview_image_url=None, highlight_id=None, page_number=None, color_tag=None, timestamp=None):
         """
         Save a highlight. If document for this URL already exists, append to highlights array.
-        Otherwise create new document.
+        Otherwise create new document (single upsert).
         
         Args:
             user_id: User ID
@@ -954,7 +1000,7 @@ class HighlightModel:
         
         Returns: highlight_id
         """
-        db = Database.get_db()
+        collection = Database.get_collection('highlights')
         
         # Use provided highlight_id or generate a new one
         if not highlight_id:
@@ -979,50 +1025,39 @@ class HighlightModel:
         if color_tag is not None:
             highlight_obj['color_tag'] = color_tag
         
-        # Check if document exists for this user+project+url combination
-        existing = db.highlights.find_one({
-            'user_id': user_id,
-            'project_id': project_id,
-            'source_url': source_url
-        })
-        
         # Use provided timestamp for updated_at if available, otherwise use server time
         update_timestamp = timestamp if timestamp is not None else datetime.utcnow()
         
-        if existing:
-            # Append to existing highlights array
-            db.highlights.update_one(
-                {
-                    'user_id': user_id,
-                    'project_id': project_id,
-                    'source_url': source_url
-                },
-                {
-                    '$push': {'highlights': highlight_obj},
-                    '$set': {'updated_at': update_timestamp}
-                }
-            )
-        else:
-            # Create new document
-            highlight_doc = {
-                'user_id': user_id,
-                'project_id': project_id,
-                'source_url': source_url,
+        # Append to the document for this user+project+url, creating it if needed, in one
+        # atomic upsert instead of find-then-insert
+        query = {
+            'user_id': user_id,
+            'project_id': project_id,
+            'source_url': source_url
+        }
+        update = {
+            '$push': {'highlights': highlight_obj},
+            '$set': {'updated_at': update_timestamp},
+            '$setOnInsert': {
                 'page_title': page_title,
-                'highlights': [highlight_obj],
                 'archived': False,  # Archive flag (only true when user manually archives)
-                'created_at': update_timestamp,  # Use browser timestamp if available
-                'updated_at': update_timestamp  # Use browser timestamp if available
+                'created_at': update_timestamp  # Use browser timestamp if available
             }
-            db.highlights.insert_one(highlight_doc)
+        }
+        try:
+            collection.update_one(query, update, upsert=True)
+        except DuplicateKeyError:
+            # A concurrent first highlight on this page created the document between our
+            # match and insert; it exists now, so the retry appends to it
+            collection.update_one(query, update, upsert=True)
         
         return highlight_id
     
     @staticmethod
     def get_highlights_by_project(user_id, project_id, limit=None):
         """Get all highlights for a project (excludes archived)"""
-        db = Database.get_db()
-        query = db.highlights.find({
+        collection = Database.get_collection('highlights')
+        query = collection.find({
             'user_id': user_id,
             'project_id': project_id,
             'archived': {'$ne': True}  # Excludes archived=True, includes False, None, or missing
@@ -1033,23 +1068,123 @@ class HighlightModel:
         
         return list(query)
     
+    @staticmethod
+    def _authorized_highlights_pipeline(user_id, project_id, source_url=None, limit=None,
+                                        highlights_per_source=None):
+        """
+        Aggregation pipeline for a project's highlights, gated on project ownership via $lookup.
+        With highlights_per_source, each document keeps only its N most recent highlights.
+        """
+        match = {'user_id': user_id, 'project_id': project_id}
+        if source_url:
+            match['source_url'] = source_url
+        else:
+            match['archived'] = {'$ne': True}
+        
+        pipeline = [{'$match': match}]
+        if source_url:
+            pipeline.append({'$limit': 1})
+        else:
+            pipeline.append({'$sort': {'updated_at': -1}})
+            if limit:
+                pipeline.append({'$limit': limit})
+        pipeline += [
+            {'$lookup': {
+                'from': 'projects',
+                'localField': 'project_id',
+                'foreignField': 'project_id',
+                'as': '_p'
+            }},
+            {'$match': {'_p.user_id': user_id}},
+            {'$project': {'_p': 0}},
+        ]
+        # Stringify _id server-side so results are JSON-ready without a Python pass
+        add_fields = {'_id': {'$toString': '$_id'}}
+        if highlights_per_source:
+            # Most recent first; highlights without a timestamp sort last ($sortArray needs MongoDB 5.2+)
+            add_fields['highlights'] = {'$slice': [
+                {'$sortArray': {'input': '$highlights', 'sortBy': {'timestamp': -1}}},
+                highlights_per_source
+            ]}
+        pipeline.append({'$addFields': add_fields})
+        return pipeline
+    
+    @staticmethod
+    def get_highlights_authorized(user_id, project_id, source_url=None, limit=None,
+                                  highlights_per_source=None):
+        """
+        Get highlights for a project in one round trip, only if the project is owned by user_id.
+        
+        Mirrors get_highlights_by_url (when source_url is given) or get_highlights_by_project,
+        with the project ownership check folded in via $lookup. Returns [] when the project
+        does not exist or belongs to someone else.
+        """
+        collection = Database.get_collection('highlights')
+        pipeline = HighlightModel._authorized_highlights_pipeline(
+            user_id, project_id, source_url, limit, highlights_per_source
+        )
+        return list(collection.aggregate(pipeline))
+    
+    @staticmethod
+    def stream_highlights_cursor(user_id, project_id, source_url=None, limit=None,
+                                 highlights_per_source=None, batch_size=200):
+        """Same as get_highlights_authorized, but returns the cursor so callers can stream documents"""
+        collection = Database.get_collection('highlights')
+        pipeline = HighlightModel._authorized_highlights_pipeline(
+            user_id, project_id, source_url, limit, highlights_per_source
+        )
+        return collection.aggregate(pipeline, batchSize=batch_size)
+    
     @staticmethod
     def get_highlights_by_url(user_id, project_id, source_url):
         """Get highlights for a specific URL"""
-        db = Database.get_db()
-        return db.highlights.find_one({
+        collection = Database.get_collection('highlights')
+        return collection.find_one({
             'user_id': user_id,
             'project_id': project_id,
             'source_url': source_url
         })
     
+    @staticmethod
+    def get_highlights_by_urls(user_id, source_urls, project_id=None):
+        """
+        Get highlights for several URLs in one query.
+        Returns {(project_id, source_url): highlights list}; URLs without highlights are absent.
+        """
+        if not source_urls:
+            return {}
+        collection = Database.get_collection('highlights')
+        query = {'user_id': user_id, 'source_url': {'$in': list(source_urls)}}
+        if project_id:
+            query['project_id'] = project_id
+        cursor = collection.find(query, {'_id': 0, 'project_id': 1, 'source_url': 1, 'highlights': 1})
+        return {
+            (doc.get('project_id'), doc['source_url']): doc.get('highlights', [])
+            for doc in cursor
+        }
+    
+    @staticmethod
+    def get_single_highlight(user_id, project_id, source_url, highlight_id):
+        """Get one highlight from a URL's highlights (positional projection ships only the match)"""
+        collection = Database.get_collection('highlights')
+        doc = collection.find_one(
+            {
+                'user_id': user_id,
+                'project_id': project_id,
+                'source_url': source_url,
+                'highlights.highlight_id': highlight_id
+            },
+            {'_id': 0, 'highlights.$': 1}
+        )
+        return doc['highlights'][0] if doc else None
+    
     @staticmethod
     def get_highlights_by_page_title(user_id, project_id, page_title):
         """Get highlights for a specific page title (case-insensitive)"""
-        db = Database.get_db()
+        collection = Database.get_collection('highlights')
         # Use case-insensitive regex for page_title match
         import re
-        return db.highlights.find_one({
+        return collection.find_one({
             'user_id': user_id,
             'project_id': project_id,
             'page_title': {'$regex': f'^{re.escape(page_title)}$', '$options': 'i'}
@@ -1064,13 +1199,13 @@ class HighlightModel:
         Returns list of highlight documents with only matching highlights included.
         """
         import re
-        db = Database.get_db()
+        collection = Database.get_collection('highlights')
         
         # Create case-insensitive regex pattern
         query_pattern = re.compile(re.escape(query), re.IGNORECASE)
         
         # Find all highlight documents for the project
-        all_docs = list(db.highlights.find({
+        all_docs = list(collection.find({
             'user_id': user_id,
             'project_id': project_id,
             'archived': {'$ne': True}
@@ -1106,15 +1241,106 @@ class HighlightModel:
                 }
                 results.append(result_doc)
         
-        # Sort by updated_at descending and limit
-        results.sort(key=lambda x: x.get('updated_at') or datetime.min, reverse=True)
-        return results[:limit]
+        # Most recently updated first, limited (top-k heap instead of a full sort)
+        return heapq.nlargest(limit, results, key=lambda x: x.get('updated_at') or datetime.min)
+
+    @staticmethod
+    def _search_result_stages(source_type, source_fields, output_fields, pattern):
+        """
+        Stages that keep a source document if its source fields or any highlight match
+        pattern, mirroring the Python filtering in search_highlights.
+
+        A source-level match keeps every highlight; otherwise only matching highlights
+        are kept.
+        """
+        def matches(expr):
+            return {'$regexMatch': {'input': {'$ifNull': [expr, '']}, 'regex': pattern, 'options': 'i'}}
+
+        matching = {'$filter': {
+            'input': {'$ifNull': ['$highlights', []]},
+            'as': 'h',
+            'cond': {'$or': [matches('$$h.text'), matches('$$h.note')]}
+        }}
+        project = {field: 1 for field in output_fields}
+        project.update({
+            'type': {'$literal': source_type},
+            'updated_at': 1,
+            'highlights': {'$cond': ['$_source_match', {'$ifNull': ['$highlights', []]}, matching]},
+            '_source_match': 1
+        })
+        return [
+            {'$addFields': {'_source_match': {'$or': [matches(f'${field}') for field in source_fields]}}},
+            {'$project': project},
+            {'$match': {'$or': [{'_source_match': True}, {'highlights.0': {'$exists': True}}]}},
+            {'$project': {'_source_match': 0}}
+        ]
+
+    @staticmethod
+    def search_all(user_id, project_id, query, limit=10):
+        """
+        Search web and PDF highlights for a project in a single aggregation.
+
+        Equivalent to merging HighlightModel.search_highlights and
+        PDFDocumentModel.search_highlights, then sorting by updated_at and trimming to
+        limit; PDF sources are pulled in with $unionWith and the merge, sort and limit
+        all happen server-side.
+        """
+        import re
+        collection = Database.get_collection('highlights')
+        pattern = re.escape(query)
+        source_match = {'user_id': user_id, 'project_id': project_id, 'archived': {'$ne': True}}
+
+        pdf_pipeline = [
+            {'$match': source_match},
+            {'$project': {'pdf_id': 1, 'filename': 1, 'file_url': 1, 'updated_at': 1}},
+            # PDF highlights live in the highlights collection, keyed by the PDF's file_url
+            {'$lookup': {
+                'from': 'highlights',
+                'localField': 'file_url',
+                'foreignField': 'source_url',
+                'pipeline': [
+                    {'$match': {'user_id': user_id, 'project_id': project_id}},
+                    {'$limit': 1},
+                    {'$project': {'highlights': 1}}
+                ],
+                'as': '_h'
+            }},
+            {'$addFields': {'highlights': {'$ifNull': [{'$first': '$_h.highlights'}, []]}}},
+            *HighlightModel._search_result_stages('pdf', ['filename'], ['pdf_id', 'filename'], pattern)
+        ]
+
+        pipeline = [
+            {'$match': source_match},
+            *HighlightModel._search_result_stages(
+                'web', ['page_title', 'source_url'], ['source_url', 'page_title'], pattern
+            ),
+            {'$unionWith': {'coll': 'pdf_documents', 'pipeline': pdf_pipeline}},
+            {'$sort': {'updated_at': -1}},
+            {'$limit': limit},
+            {'$addFields': {'_id': {'$toString': '$_id'}}}
+        ]
+        return list(collection.aggregate(pipeline))
+
+    @staticmethod
+    def update_preview_url(user_id, project_id, source_url, highlight_id, preview_image_url):
+        """Set preview_image_url on a single highlight (filled in after the preview is generated)"""
+        collection = Database.get_collection('highlights')
+        result = collection.update_one(
+            {
+                'user_id': user_id,
+                'project_id': project_id,
+                'source_url': source_url,
+                'highlights.highlight_id': highlight_id
+            },
+            {'$set': {'highlights.$.preview_image_url': preview_image_url}}
+        )
+        return result.modified_count > 0
     
     @staticmethod
     def delete_highlight(user_id, project_id, source_url, highlight_id):
         """Delete a specific highlight from the highlights array"""
-        db = Database.get_db()
-        result = db.highlights.update_one(
+        collection = Database.get_collection('highlights')
+        result = collection.update_one(
             {
                 'user_id': user_id,
                 'project_id': project_id,
@@ -1130,8 +1356,8 @@ class HighlightModel:
     @staticmethod
     def archive_highlight(user_id, project_id, source_url):
         """Archive a web highlight document"""
-        db = Database.get_db()
-        result = db.highlights.update_one(
+        collection = Database.get_collection('highlights')
+        result = collection.update_one(
             {
                 'user_id': user_id,
                 'project_id': project_id,
@@ -1144,8 +1370,8 @@ class HighlightModel:
     @staticmethod
     def unarchive_highlight(user_id, project_id, source_url):
         """Unarchive a web highlight document"""
-        db = Database.get_db()
-        result = db.highlights.update_one(
+        collection = Database.get_collection('highlights')
+        result = collection.update_one(
             {
                 'user_id': user_id,
                 'project_id': project_id,
@@ -1158,8 +1384,8 @@ class HighlightModel:
     @staticmethod
     def delete_source(user_id, project_id, source_url):
         """Delete an entire source document and all its highlights from the database"""
-        db = Database.get_db()
-        result = db.highlights.delete_one(
+        collection = Database.get_collection('highlights')
+        result = collection.delete_one(
             {
                 'user_id': user_id,
                 'project_id': project_id,
@@ -1232,7 +1458,7 @@ class PDFDocumentModel:
         return 'yellow'
     
     @staticmethod
-    def create_pdf_document(user_id, project_id, filename, file_url=None, file_data=None, content_type='application/pdf', pdf_id=None):
+    def create_pdf_document(user_id, project_id, filename, file_url=None, file_id=None, content_type='application/pdf', pdf_id=None):
         """
         Create a new PDF document entry.
         
@@ -1241,7 +1467,7 @@ class PDFDocumentModel:
             project_id: Project ID
             filename: Original filename
             file_url: S3 URL for the file (preferred for new uploads)
-            file_data: Binary PDF data (base64 encoded string) - legacy support only
+            file_id: GridFS id of the file (from store_file) when S3 is unavailable
             content_type: MIME type
             pdf_id: Optional pre-generated PDF ID (used when uploading to S3 first)
         
@@ -1249,32 +1475,61 @@ class PDFDocumentModel:
             pdf_document_id
         """
         db = Database.get_db()
-        if not pdf_id:
-            pdf_id = str(uuid.uuid4())
+        pdf_doc = PDFDocumentModel._new_pdf_document(
+            user_id, project_id, filename, file_url, file_id, content_type, pdf_id
+        )
+        db.pdf_documents.insert_one(pdf_doc)
+        return pdf_doc['pdf_id']
+    
+    @staticmethod
+    def create_pdf_documents(user_id, project_id, files):
+        """
+        Create several PDF document entries in one insert.
         
-        pdf_doc = {
-            'pdf_id': pdf_id,
+        Args:
+            user_id: User ID
+            project_id: Project ID
+            files: List of dicts with filename, file_url, file_id, content_type and pdf_id
+                   (same meaning as the create_pdf_document arguments)
+        
+        Returns:
+            List of pdf_document_ids, in input order
+        """
+        db = Database.get_db()
+        pdf_docs = [
+            PDFDocumentModel._new_pdf_document(
+                user_id, project_id, f['filename'], f.get('file_url'), f.get('file_id'),
+                f.get('content_type', 'application/pdf'), f.get('pdf_id')
+            )
+            for f in files
+        ]
+        if pdf_docs:
+            db.pdf_documents.insert_many(pdf_docs)
+        return [pdf_doc['pdf_id'] for pdf_doc in pdf_docs]
+    
+    @staticmethod
+    def _new_pdf_document(user_id, project_id, filename, file_url, file_id, content_type, pdf_id):
+        now = datetime.utcnow()
+        return {
+            'pdf_id': pdf_id or str(uuid.uuid4()),
             'user_id': user_id,
             'project_id': project_id,
             'filename': filename,
             'file_url': file_url,  # S3 URL for the file (new uploads)
-            'file_data': file_data,  # Base64 encoded PDF data (legacy - only for backward compatibility)
+            'file_id': file_id,  # GridFS file id (only when S3 is unavailable)
             'content_type': content_type,
             # Highlights are now stored in highlights collection, not here
             'extraction_status': 'pending',  # pending, processing, completed, failed
             'archived': False,  # Archive flag (only true when user manually archives)
-            'created_at': datetime.utcnow(),
-            'updated_at': datetime.utcnow()
+            'created_at': now,
+            'updated_at': now
         }
-        
-        db.pdf_documents.insert_one(pdf_doc)
-        return pdf_id
     
     @staticmethod
-    def get_pdf_document(pdf_id):
-        """Get a PDF document by ID"""
+    def get_pdf_document(pdf_id, projection=None):
+        """Get a PDF document by ID (pass a projection, e.g. {'file_data': 0}, to skip large fields)"""
         db = Database.get_db()
-        return db.pdf_documents.find_one({'pdf_id': pdf_id})
+        return db.pdf_documents.find_one({'pdf_id': pdf_id}, projection)
     
     @staticmethod
     def get_pdf_documents_by_project(user_id, project_id):
@@ -1287,7 +1542,7 @@ class PDFDocumentModel:
                 'project_id': project_id,
                 'archived': {'$ne': True}  # Excludes archived=True, includes False, None, or missing
             },
-            {'file_data': 0}
+            PDF_METADATA_PROJECTION
         ).sort('updated_at', -1))
     
     @staticmethod
@@ -1299,18 +1554,74 @@ class PDFDocumentModel:
                 'user_id': user_id,
                 'archived': {'$ne': True}  # Excludes archived=True, includes False, None, or missing
             },
-            {'file_data': 0}
+            PDF_METADATA_PROJECTION
         ).sort('updated_at', -1))
     
     @staticmethod
-    def get_pdf_file_data(pdf_id):
-        """Get file data/URL for a PDF document"""
+    def get_highlight_for_user(pdf_id, user_id, highlight_id):
+        """
+        Get a user's PDF together with one of its highlights, in a single aggregation.
+        Returns {'file_url': ..., 'highlight': {...}} (either key absent if missing),
+        or None if the PDF doesn't exist or isn't owned by user_id.
+        """
         db = Database.get_db()
-        doc = db.pdf_documents.find_one(
-            {'pdf_id': pdf_id},
-            {'file_url': 1, 'file_data': 1, 'content_type': 1, 'filename': 1}
+        pipeline = [
+            {'$match': {'pdf_id': pdf_id, 'user_id': user_id}},
+            {'$project': {'_id': 0, 'project_id': 1, 'file_url': 1}},
+            {'$lookup': {
+                'from': 'highlights',
+                'localField': 'file_url',
+                'foreignField': 'source_url',
+                'let': {'project_id': '$project_id'},
+                'pipeline': [
+                    {'$match': {'user_id': user_id, '$expr': {'$eq': ['$project_id', '$$project_id']}}},
+                    {'$limit': 1},
+                    {'$project': {'_id': 0, 'highlight': {'$first': {'$filter': {
+                        'input': '$highlights',
+                        'cond': {'$eq': ['$$this.highlight_id', {'$literal': highlight_id}]}
+                    }}}}}
+                ],
+                'as': '_h'
+            }},
+            {'$project': {'file_url': 1, 'highlight': {'$first': '$_h.highlight'}}}
+        ]
+        return next(db.pdf_documents.aggregate(pipeline), None)
+    
+    @staticmethod
+    def store_file(file_bytes, filename, content_type):
+        """Store raw file bytes in GridFS and return the file id"""
+        return Database.get_fs().put(file_bytes, filename=filename, content_type=content_type)
+    
+    @staticmethod
+    def open_file(file_id):
+        """Open a GridFS file for reading (file-like, streamable), or None if it is gone"""
+        try:
+            return Database.get_fs().get(file_id)
+        except gridfs.NoFile:
+            return None
+    
+    @staticmethod
+    def delete_file(file_id):
+        """Delete a GridFS file and its chunks"""
+        Database.get_fs().delete(file_id)
+    
+    @staticmethod
+    def has_file_data(pdf_id):
+        """Check whether a document still has legacy inline file_data, without loading it"""
+        db = Database.get_db()
+        return db.pdf_documents.count_documents(
+            {'pdf_id': pdf_id, 'file_data': {'$nin': [None, '']}}, limit=1
+        ) == 1
+    
+    @staticmethod
+    def move_file_data_to_url(pdf_id, file_url):
+        """Replace a legacy document's inline file_data with its new S3 file_url"""
+        db = Database.get_db()
+        result = db.pdf_documents.update_one(
+            {'pdf_id': pdf_id, 'file_data': {'$exists': True}},
+            {'$set': {'file_url': file_url}, '$unset': {'file_data': ''}}
         )
-        return doc
+        return result.modified_count > 0
     
     @staticmethod
     def update_highlights(pdf_id, highlights):
@@ -1321,7 +1632,7 @@ class PDFDocumentModel:
         db = Database.get_db()
         
         # Get PDF document to retrieve metadata
-        pdf_doc = PDFDocumentModel.get_pdf_document(pdf_id)
+        pdf_doc = PDFDocumentModel.get_pdf_document(pdf_id, PDF_METADATA_PROJECTION)
         if not pdf_doc:
             logger.error(f"[DB] PDF {pdf_id} does not exist in database")
             return False
@@ -1402,7 +1713,7 @@ class PDFDocumentModel:
     def add_highlight(pdf_id, highlight_text, color, page_number=None, note=None):
         """Add a single highlight to a PDF document (saves to highlights collection)"""
         # Get PDF document to retrieve metadata
-        pdf_doc = PDFDocumentModel.get_pdf_document(pdf_id)
+        pdf_doc = PDFDocumentModel.get_pdf_document(pdf_id, PDF_METADATA_PROJECTION)
         if not pdf_doc:
             raise ValueError(f"PDF {pdf_id} not found")
         
@@ -1442,7 +1753,7 @@ class PDFDocumentModel:
     def delete_highlight(pdf_id, highlight_id):
         """Delete a specific highlight from a PDF document (deletes from highlights collection)"""
         # Get PDF document to retrieve file_url
-        pdf_doc = PDFDocumentModel.get_pdf_document(pdf_id)
+        pdf_doc = PDFDocumentModel.get_pdf_document(pdf_id, PDF_METADATA_PROJECTION)
         if not pdf_doc:
             return False
         
@@ -1486,7 +1797,7 @@ class PDFDocumentModel:
             'user_id': user_id,
             'project_id': project_id,
             'archived': {'$ne': True}
-        }, {'file_data': 0}))  # Exclude file_data for performance
+        }, PDF_METADATA_PROJECTION))  # Exclude file_data/legacy highlights for performance
         
         results = []
         for doc in all_docs:
@@ -1525,15 +1836,14 @@ class PDFDocumentModel:
                 }
                 results.append(result_doc)
         
-        # Sort by updated_at descending and limit
-        results.sort(key=lambda x: x.get('updated_at') or datetime.min, reverse=True)
-        return results[:limit]
+        # Most recently updated first, limited (top-k heap instead of a full sort)
+        return heapq.nlargest(limit, results, key=lambda x: x.get('updated_at') or datetime.min)
     
     @staticmethod
     def update_highlight_note(pdf_id, highlight_id, note):
         """Update the note for a specific highlight (updates in highlights collection)"""
         # Get PDF document to retrieve file_url
-        pdf_doc = PDFDocumentModel.get_pdf_document(pdf_id)
+        pdf_doc = PDFDocumentModel.get_pdf_document(pdf_id, PDF_METADATA_PROJECTION)
         if not pdf_doc:
             return False
         
@@ -1571,31 +1881,49 @@ class PDFDocumentModel:
         return result.modified_count > 0
     
     @staticmethod
-    def archive_pdf_document(pdf_id):
-        """Archive a PDF document"""
+    def archive_pdf_document(pdf_id, user_id):
+        """
+        Archive a user's PDF document in one round trip.
+        Returns the document's project_id ({'project_id': ...}), or None if not found/not owned.
+        """
+        return PDFDocumentModel._set_archived(pdf_id, user_id, True)
+    
+    @staticmethod
+    def unarchive_pdf_document(pdf_id, user_id):
+        """
+        Unarchive a user's PDF document in one round trip.
+        Returns the document's project_id ({'project_id': ...}), or None if not found/not owned.
+        """
+        return PDFDocumentModel._set_archived(pdf_id, user_id, False)
+    
+    @staticmethod
+    def _set_archived(pdf_id, user_id, archived):
         db = Database.get_db()
-        result = db.pdf_documents.update_one(
-            {'pdf_id': pdf_id},
-            {'$set': {'archived': True, 'updated_at': datetime.utcnow()}}
+        return db.pdf_documents.find_one_and_update(
+            {'pdf_id': pdf_id, 'user_id': user_id},
+            {'$set': {'archived': archived, 'updated_at': datetime.utcnow()}},
+            projection={'_id': 0, 'project_id': 1}
         )
-        return result.modified_count > 0
     
     @staticmethod
-    def unarchive_pdf_document(pdf_id):
-        """Unarchive a PDF document"""
+    def delete_pdf_documents(user_id, pdf_ids):
+        """Delete several of a user's PDF document entries (their files are not touched)"""
+        if not pdf_ids:
+            return 0
         db = Database.get_db()
-        result = db.pdf_documents.update_one(
-            {'pdf_id': pdf_id},
-            {'$set': {'archived': False, 'updated_at': datetime.utcnow()}}
-        )
-        return result.modified_count > 0
+        return db.pdf_documents.delete_many({'pdf_id': {'$in': pdf_ids}, 'user_id': user_id}).deleted_count
     
     @staticmethod
     def delete_pdf_document(pdf_id, user_id):
-        """Delete a PDF document"""
+        """
+        Delete a user's PDF document in one round trip.
+        Returns the deleted document's project_id, file_url and file_id, or None if not found/not owned.
+        """
         db = Database.get_db()
-        result = db.pdf_documents.delete_one({'pdf_id': pdf_id, 'user_id': user_id})
-        return result.deleted_count > 0
+        return db.pdf_documents.find_one_and_delete(
+            {'pdf_id': pdf_id, 'user_id': user_id},
+            projection={'_id': 0, 'project_id': 1, 'file_url': 1, 'file_id': 1}
+        )
 
 
 
@@ -1,4 +1,5 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, send_file, g
+from functools import wraps
 from utils.file_helpers import get_session_dir
 from models.database import ChatSessionModel, ResearchDocumentModel, ProjectModel
 from services.vector_service import VectorService
@@ -26,30 +27,77 @@ document_bp = Blueprint('document', __name__)
 
 # get_user_id_from_token is now imported from utils.auth
 
+def require_document_owner(f):
+    """
+    Authenticate the caller and verify they own the requested research document.
+    
+    Reads document_id from the route args, query string, or JSON body (in that order),
+    fetches the document once, and exposes it as g.document (and the caller as g.user_id)
+    so handlers don't need to re-fetch it.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        try:
+            user_id = get_user_id_from_token()
+            if not user_id:
+                return jsonify({'error': 'Unauthorized'}), 401
+            
+            document_id = kwargs.get('document_id') or request.args.get('document_id')
+            if not document_id and request.is_json:
+                document_id = (request.get_json(silent=True) or {}).get('document_id')
+            
+            if not document_id:
+                return jsonify({'error': 'document_id is required'}), 400
+            
+            document = ResearchDocumentModel.get_document(document_id)
+            if not document:
+                return jsonify({'error': 'Document not found'}), 404
+            
+            if document['user_id'] != user_id:
+                return jsonify({'error': 'Unauthorized'}), 403
+            
+            # Log auth info for Chrome extension
+            log_auth_info(document.get('project_id'))
+            
+            g.user_id = user_id
+            g.document = document
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+        
+        return f(*args, **kwargs)
+    
+    return decorated
+
+def reject_oversized_patch(f):
+    """
+    Reject save payloads whose patches or delta exceed Config.MAX_PATCH_BYTES with a 413.
+    
+    Applied outside require_document_owner so oversized payloads are refused before any
+    DB read: first from the declared Content-Length (both fields at the limit plus slack for
+    the small ones), then per field from the parsed body (Flask caches the parse for the handler).
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if request.content_length and request.content_length > 2 * Config.MAX_PATCH_BYTES + 64 * 1024:
+            return jsonify({'error': 'patch too large'}), 413
+        
+        data = request.get_json(silent=True) or {}
+        patches, delta = data.get('patches'), data.get('delta')
+        if (patches and len(patches) > Config.MAX_PATCH_BYTES) or (delta and len(delta) > Config.MAX_PATCH_BYTES):
+            return jsonify({'error': 'patch too large'}), 413
+        
+        return f(*args, **kwargs)
+    
+    return decorated
+
 @document_bp.route('/document', methods=['GET'])
 @limiter.limit("60 per minute") if limiter else lambda f: f
+@require_document_owner
 def get_document():
     """Get document content with version for delta sync"""
     try:
-        user_id = get_user_id_from_token()
-        if not user_id:
-            return jsonify({'error': 'Unauthorized'}), 401
-        
-        document_id = request.args.get('document_id')
-        
-        if not document_id:
-            return jsonify({'error': 'document_id is required'}), 400
-        
-        document = ResearchDocumentModel.get_document(document_id)
-        if not document:
-            return jsonify({'error': 'Document not found'}), 404
-        
-        if document['user_id'] != user_id:
-            return jsonify({'error': 'Unauthorized'}), 403
-        
-        # Log auth info for Chrome extension
-        project_id = document.get('project_id')
-        log_auth_info(project_id)
+        document = g.document
+        document_id = document['document_id']
         
         # Get content - support both old (markdown_content) and new (content) field names
         content = document.get('content', '') or document.get('markdown_content', '')
@@ -67,36 +115,25 @@ def get_document():
 
 @document_bp.route('/document', methods=['POST'])
 @limiter.limit("30 per minute") if limiter else lambda f: f
+@reject_oversized_patch
+@require_document_owner
 def save_document():
     """Save document using delta patches for efficiency"""
     try:
-        user_id = get_user_id_from_token()
-        if not user_id:
-            return jsonify({'error': 'Unauthorized'}), 401
+        user_id = g.user_id
+        document = g.document
+        document_id = document['document_id']
+        project_id = document.get('project_id')
         
         data = request.get_json()
-        document_id = data.get('document_id')
         patches = data.get('patches', '')  # Patch text from diff-match-patch
+        delta = data.get('delta')  # Compact diff_toDelta form (preferred over patches when present)
         version = data.get('version', 0)  # Expected version for optimistic locking
         title = data.get('title')
         should_generate_snapshot = data.get('should_generate_snapshot', True)  # Phase 3: Default to True for backward compatibility
         
-        if not document_id:
-            return jsonify({'error': 'document_id is required'}), 400
-        
-        document = ResearchDocumentModel.get_document(document_id)
-        if not document:
-            return jsonify({'error': 'Document not found'}), 404
-        
-        if document['user_id'] != user_id:
-            return jsonify({'error': 'Unauthorized'}), 403
-        
-        # Log auth info for Chrome extension
-        project_id = document.get('project_id')
-        log_auth_info(project_id)
-        
         # Apply delta patches
-        result = ResearchDocumentModel.apply_delta(document_id, patches, version)
+        result = ResearchDocumentModel.apply_delta(document_id, patches, version, delta_text=delta)
         
         if not result['success']:
             error_msg = result.get('error', 'Unknown error')
@@ -109,15 +146,12 @@ def save_document():
         
         new_version = result['new_version']
         new_content_length = result['new_content_length']
+        new_content = result['new_content']
         
         # Update title if provided (separate from delta)
         if title:
             ResearchDocumentModel.rename_document(document_id, title)
         
-        # Get the new content for snapshot and indexing
-        updated_doc = ResearchDocumentModel.get_document(document_id)
-        new_content = updated_doc.get('content', '')
-        
         # Phase 3: Generate snapshot only if should_generate_snapshot is True
         if should_generate_snapshot:
             # Generate snapshot from HTML content (don't fail save if this fails)
@@ -128,15 +162,15 @@ def save_document():
                 if snapshot:
                     ResearchDocumentModel.update_document(document_id, snapshot=snapshot)
             except Exception as snapshot_error:
-                logger.warning(f"Failed to generate snapshot: {snapshot_error}")
+                logger.warning("Failed to generate snapshot: %s", snapshot_error)
         else:
-            logger.debug(f"[DELTA SAVE] Snapshot generation skipped (edit not on first page)")
+            logger.debug("[DELTA SAVE] Snapshot generation skipped (edit not on first page)")
         
         # Index document for semantic search (don't fail save if this fails)
         try:
             vector_service.index_document(document_id, new_content)
         except Exception as index_error:
-            logger.warning(f"Failed to index document: {index_error}")
+            logger.warning("Failed to index document: %s", index_error)
         
         # Invalidate cache (document list cache, not content cache - that's handled by version)
         redis_service = get_redis_service()
@@ -145,8 +179,8 @@ def save_document():
             redis_service.delete(cache_key)
         redis_service.delete(f"cache:documents:{user_id}:all")
         redis_service.delete_pattern(f"cache:doc:{document_id}:*")
-        logger.debug(f"[REDIS] Invalidating cache: cache:documents:{user_id}:{project_id or 'all'}")
-        logger.debug(f"[REDIS] Cache invalidated successfully")
+        logger.debug("[REDIS] Invalidating cache: cache:documents:%s:%s", user_id, project_id or 'all')
+        logger.debug("[REDIS] Cache invalidated successfully")
         
         return jsonify({
             'status': 'ok',
@@ -158,6 +192,22 @@ def save_document():
         log_error(logger, e, "Error saving document")
         return jsonify({'error': str(e)}), 500
 
+def iter_paragraphs(path):
+    """
+    Yield blank-line separated paragraphs from a text file, reading it line by line.
+    Memory use is bounded by the largest paragraph rather than the whole file.
+    """
+    buf = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                buf.append(line)
+            elif buf:
+                yield ''.join(buf).rstrip('\n')
+                buf = []
+    if buf:
+        yield ''.join(buf).rstrip('\n')
+
 @document_bp.route('/document/pdf', methods=['GET'])
 @limiter.limit("10 per minute") if limiter else lambda f: f
 def download_pdf():
@@ -187,9 +237,6 @@ def download_pdf():
         if not os.path.exists(doc_path):
             return jsonify({'error': 'Document not found'}), 404
         
-        with open(doc_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
         # Create PDF in memory
         buffer = BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=letter,
@@ -210,14 +257,12 @@ def download_pdf():
             spaceAfter=12
         )
         
-        # Split content into paragraphs and add to PDF
-        paragraphs = content.split('\n\n')
-        for para in paragraphs:
-            if para.strip():
-                # Replace newlines within paragraphs with <br/>
-                para_text = para.replace('\n', '<br/>')
-                story.append(Paragraph(para_text, normal_style))
-                story.append(Spacer(1, 0.2*inch))
+        # Stream paragraphs from disk and add to PDF (never holds the whole file in memory)
+        for para in iter_paragraphs(doc_path):
+            # Replace newlines within paragraphs with <br/>
+            para_text = para.replace('\n', '<br/>')
+            story.append(Paragraph(para_text, normal_style))
+            story.append(Spacer(1, 0.2*inch))
         
         # Build PDF
         doc.build(story)
@@ -238,6 +283,27 @@ def download_pdf():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _collapse_newlines(text):
+    """
+    Collapse runs of 3+ newlines down to 2 (equivalent to re.sub(r'\n{3,}', '\n\n', text)).
+    Uses str.find and slicing so the scan runs in C without regex engine overhead.
+    """
+    out = []
+    i = 0
+    n = len(text)
+    while i < n:
+        j = text.find('\n', i)
+        if j < 0:
+            out.append(text[i:])
+            break
+        out.append(text[i:j])
+        k = j
+        while k < n and text[k] == '\n':
+            k += 1
+        out.append('\n\n' if k - j >= 2 else '\n')
+        i = k
+    return ''.join(out)
+
 def markdown_to_plain_text(markdown_content):
     """
     Convert markdown content to plain text by stripping markdown syntax.
@@ -283,27 +349,18 @@ def markdown_to_plain_text(markdown_content):
     text = re.sub(r'^>\s+', '', text, flags=re.MULTILINE)
     
     # Clean up extra whitespace
-    text = re.sub(r'\n{3,}', '\n\n', text)  # Max 2 consecutive newlines
+    text = _collapse_newlines(text)  # Max 2 consecutive newlines
     text = text.strip()
     
     return text
 
 @document_bp.route('/document/research-documents/<document_id>/pdf', methods=['GET'])
 @limiter.limit("10 per minute") if limiter else lambda f: f
+@require_document_owner
 def download_research_document_pdf(document_id):
     """Download research document as PDF (converts markdown to plain text)"""
     try:
-        user_id = get_user_id_from_token()
-        if not user_id:
-            return jsonify({'error': 'Unauthorized'}), 401
-        
-        # Get document
-        document = ResearchDocumentModel.get_document(document_id)
-        if not document:
-            return jsonify({'error': 'Document not found'}), 404
-        
-        if document['user_id'] != user_id:
-            return jsonify({'error': 'Unauthorized'}), 403
+        document = g.document
         
         # Get content (support both old and new field names)
         html_content = document.get('content', '') or document.get('markdown_content', '')
@@ -396,12 +453,12 @@ def get_all_research_documents():
         cached_data = redis_service.get(cache_key)
         
         if cached_data is not None:
-            logger.debug(f"[REDIS] get_all_research_documents: Cache hit")
+            logger.debug("[REDIS] get_all_research_documents: Cache hit")
             return jsonify(cached_data), 200
         
         # Cache miss - fetch from MongoDB
-        logger.debug(f"[REDIS] get_all_research_documents: Checking cache for user {user_id}, project {project_id}")
-        logger.debug(f"[REDIS] get_all_research_documents: Cache miss, fetching from MongoDB")
+        logger.debug("[REDIS] get_all_research_documents: Checking cache for user %s, project %s", user_id, project_id)
+        logger.debug("[REDIS] get_all_research_documents: Cache miss, fetching from MongoDB")
         
         documents = ResearchDocumentModel.get_all_documents(user_id, project_id)
         
@@ -422,7 +479,7 @@ def get_all_research_documents():
         
         # Cache the result
         redis_service.set(cache_key, response_data, ttl=Config.REDIS_TTL_DOCUMENTS)
-        logger.debug(f"[REDIS] get_all_research_documents: Cached {len(serialized_docs)} documents")
+        logger.debug("[REDIS] get_all_research_documents: Cached %s documents", len(serialized_docs))
         
         return jsonify(response_data), 200
     
@@ -461,8 +518,8 @@ def create_research_document():
         redis_service.delete(cache_key)
         # Also invalidate "all" cache
         redis_service.delete(f"cache:documents:{user_id}:all")
-        logger.debug(f"[REDIS] Invalidating cache: cache:documents:{user_id}:{project_id}")
-        logger.debug(f"[REDIS] Cache invalidated successfully")
+        logger.debug("[REDIS] Invalidating cache: cache:documents:%s:%s", user_id, project_id)
+        logger.debug("[REDIS] Cache invalidated successfully")
         
         return jsonify({
             'document_id': document_id,
@@ -474,19 +531,12 @@ def create_research_document():
 
 @document_bp.route('/document/research-documents/<document_id>', methods=['DELETE'])
 @limiter.limit("10 per minute") if limiter else lambda f: f
+@require_document_owner
 def delete_research_document(document_id):
     """Delete a research document"""
     try:
-        user_id = get_user_id_from_token()
-        if not user_id:
-            return jsonify({'error': 'Unauthorized'}), 401
-        
-        document = ResearchDocumentModel.get_document(document_id)
-        if not document:
-            return jsonify({'error': 'Document not found'}), 404
-        
-        if document['user_id'] != user_id:
-            return jsonify({'error': 'Unauthorized'}), 403
+        user_id = g.user_id
+        document = g.document
         
         project_id = document.get('project_id')
         
@@ -501,8 +551,8 @@ def delete_research_document(document_id):
             # Also invalidate "all" cache and document-specific caches
             redis_service.delete(f"cache:documents:{user_id}:all")
             redis_service.delete_pattern(f"cache:doc:{document_id}:*")
-            logger.debug(f"[REDIS] Invalidating cache: cache:documents:{user_id}:{project_id or 'all'}")
-            logger.debug(f"[REDIS] Cache invalidated successfully")
+            logger.debug("[REDIS] Invalidating cache: cache:documents:%s:%s", user_id, project_id or 'all')
+            logger.debug("[REDIS] Cache invalidated successfully")
             
             return jsonify({'status': 'deleted'}), 200
         else:
@@ -513,19 +563,12 @@ def delete_research_document(document_id):
 
 @document_bp.route('/document/research-documents/<document_id>/archive', methods=['POST'])
 @limiter.limit("10 per minute") if limiter else lambda f: f
+@require_document_owner
 def archive_document(document_id):
     """Archive a research document"""
     try:
-        user_id = get_user_id_from_token()
-        if not user_id:
-            return jsonify({'error': 'Unauthorized'}), 401
-        
-        document = ResearchDocumentModel.get_document(document_id)
-        if not document:
-            return jsonify({'error': 'Document not found'}), 404
-        
-        if document['user_id'] != user_id:
-            return jsonify({'error': 'Unauthorized'}), 403
+        user_id = g.user_id
+        document = g.document
         
         project_id = document.get('project_id')
         
@@ -540,8 +583,8 @@ def archive_document(document_id):
             cache_key = f"cache:documents:{user_id}:{project_id}"
             redis_service.delete(cache_key)
         redis_service.delete(f"cache:documents:{user_id}:all")
-        logger.debug(f"[REDIS] Invalidating cache: cache:documents:{user_id}:{project_id or 'all'}")
-        logger.debug(f"[REDIS] Cache invalidated successfully")
+        logger.debug("[REDIS] Invalidating cache: cache:documents:%s:%s", user_id, project_id or 'all')
+        logger.debug("[REDIS] Cache invalidated successfully")
         
         return jsonify({'status': 'ok'}), 200
     
@@ -550,19 +593,12 @@ def archive_document(document_id):
 
 @document_bp.route('/document/research-documents/<document_id>/unarchive', methods=['POST'])
 @limiter.limit("10 per minute") if limiter else lambda f: f
+@require_document_owner
 def unarchive_document(document_id):
     """Unarchive a research document"""
     try:
-        user_id = get_user_id_from_token()
-        if not user_id:
-            return jsonify({'error': 'Unauthorized'}), 401
-        
-        document = ResearchDocumentModel.get_document(document_id)
-        if not document:
-            return jsonify({'error': 'Document not found'}), 404
-        
-        if document['user_id'] != user_id:
-            return jsonify({'error': 'Unauthorized'}), 403
+        user_id = g.user_id
+        document = g.document
         
         project_id = document.get('project_id')
         
@@ -577,8 +613,8 @@ def unarchive_document(document_id):
             cache_key = f"cache:documents:{user_id}:{project_id}"
             redis_service.delete(cache_key)
         redis_service.delete(f"cache:documents:{user_id}:all")
-        logger.debug(f"[REDIS] Invalidating cache: cache:documents:{user_id}:{project_id or 'all'}")
-        logger.debug(f"[REDIS] Cache invalidated successfully")
+        logger.debug("[REDIS] Invalidating cache: cache:documents:%s:%s", user_id, project_id or 'all')
+        logger.debug("[REDIS] Cache invalidated successfully")
         
         return jsonify({'status': 'ok'}), 200
     
@@ -587,12 +623,12 @@ def unarchive_document(document_id):
 
 @document_bp.route('/document/research-documents/<document_id>/rename', methods=['PATCH'])
 @limiter.limit("10 per minute") if limiter else lambda f: f
+@require_document_owner
 def rename_document(document_id):
     """Rename a research document"""
     try:
-        user_id = get_user_id_from_token()
-        if not user_id:
-            return jsonify({'error': 'Unauthorized'}), 401
+        user_id = g.user_id
+        document = g.document
         
         data = request.get_json()
         new_title = data.get('title')
@@ -600,13 +636,6 @@ def rename_document(document_id):
         if not new_title or not new_title.strip():
             return jsonify({'error': 'Title is required'}), 400
         
-        document = ResearchDocumentModel.get_document(document_id)
-        if not document:
-            return jsonify({'error': 'Document not found'}), 404
-        
-        if document['user_id'] != user_id:
-            return jsonify({'error': 'Unauthorized'}), 403
-        
         project_id = document.get('project_id')
         
         success = ResearchDocumentModel.rename_document(document_id, new_title.strip())
@@ -621,8 +650,8 @@ def rename_document(document_id):
             redis_service.delete(cache_key)
         redis_service.delete(f"cache:documents:{user_id}:all")
         redis_service.delete_pattern(f"cache:doc:{document_id}:*")
-        logger.debug(f"[REDIS] Invalidating cache: cache:documents:{user_id}:{project_id or 'all'}")
-        logger.debug(f"[REDIS] Cache invalidated successfully")
+        logger.debug("[REDIS] Invalidating cache: cache:documents:%s:%s", user_id, project_id or 'all')
+        logger.debug("[REDIS] Cache invalidated successfully")
         
         return jsonify({'status': 'ok', 'title': new_title.strip()}), 200
     
@@ -631,19 +660,11 @@ def rename_document(document_id):
 
 @document_bp.route('/document/research-documents/<document_id>/generate-snapshot', methods=['POST'])
 @limiter.limit("10 per minute") if limiter else lambda f: f
+@require_document_owner
 def generate_snapshot_for_document(document_id):
     """Generate snapshot for an existing document that doesn't have one"""
     try:
-        user_id = get_user_id_from_token()
-        if not user_id:
-            return jsonify({'error': 'Unauthorized'}), 401
-        
-        document = ResearchDocumentModel.get_document(document_id)
-        if not document:
-            return jsonify({'error': 'Document not found'}), 404
-        
-        if document['user_id'] != user_id:
-            return jsonify({'error': 'Unauthorized'}), 403
+        document = g.document
         
         # Get document content (support both old and new field names)
         html_content = document.get('content', '') or document.get('markdown_content', '')
@@ -1,5 +1,5 @@
-from flask import Blueprint, request, jsonify
-from models.database import HighlightModel, ProjectModel, PDFDocumentModel
+from flask import Blueprint, request, current_app, g
+from models.database import HighlightModel
 from utils.auth import get_user_id_from_token, log_auth_info
 from utils.rate_limiter import get_limiter
 from services.s3_service import S3Service
@@ -8,42 +8,213 @@ from services.redis_service import get_redis_service
 from services.sse_service import SSEService
 from config import Config
 from utils.logger import get_logger
+from utils.project_cache import project_belongs_to
+from utils.highlight_cache import invalidate_highlight_caches, highlights_etag_key, highlights_index_key
+from utils.json_response import ojsonify, json_bytes_response, dumps as json_dumps
 from datetime import datetime
-import base64
+from cachetools import TTLCache
+import orjson
+import binascii
+import logging
 import io
 import re
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Annotated, Optional
+import msgspec
 
 logger = get_logger(__name__)
 
 # Get rate limiter instance
 limiter = get_limiter()
 
+# Redis service singleton, resolved once per process instead of per request
+redis_service = get_redis_service()
+
 # Try to import PIL for image processing
 try:
-    from PIL import Image
+    import PIL
+    from PIL import Image, features
     PIL_AVAILABLE = True
+    # Report the build actually loaded: stock Pillow unless the optional pillow-simd swap
+    # from requirements.txt was applied (pillow-simd versions end in '.postN')
+    logger.info(
+        "Pillow %s loaded for highlight previews (pillow-simd: %s, libjpeg %s, libjpeg-turbo: %s)",
+        PIL.__version__, '.post' in PIL.__version__,
+        features.version('jpg'), features.check_feature('libjpeg_turbo')
+    )
+    _PREVIEW_RESAMPLE = getattr(Image.Resampling, Config.PREVIEW_RESAMPLE_FILTER.upper(), Image.Resampling.LANCZOS)
 except ImportError:
     PIL_AVAILABLE = False
     logger.warning("Pillow not installed. Web highlight previews will not be generated.")
 
+# Optional: SIMD base64 decoder for screenshots (falls back to binascii; both skip
+# non-alphabet characters the same way)
+try:
+    from pybase64 import b64decode as _b64decode
+except ImportError:
+    _b64decode = binascii.a2b_base64
+
+# Optional: libjpeg-turbo encoder for previews (falls back to Pillow's JPEG encoder)
+try:
+    import numpy as np
+    import simplejpeg
+    SIMPLEJPEG_AVAILABLE = True
+except ImportError:
+    SIMPLEJPEG_AVAILABLE = False
+
 highlight_bp = Blueprint('highlight', __name__)
 
+# Recent and in-flight saves keyed by a digest of (user, project, url, text), so a double-fired
+# save from the extension returns the first save's highlight_id instead of inserting twice.
+# Values are Futures: the first request claims the key before saving and resolves it with the
+# highlight_id, so duplicates that overlap the save wait on it (up to _DEDUPE_WAIT_SECONDS)
+_recent_saves = TTLCache(maxsize=1024, ttl=2)
+_recent_saves_lock = threading.Lock()
+_DEDUPE_WAIT_SECONDS = 10
+
+# Background pool for preview generation + S3 upload, so save_highlight returns after the insert.
+# Each pending job holds its screenshot, so the backlog is capped; saves past the cap skip the preview
+_preview_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='highlight-preview')
+_preview_slots = threading.BoundedSemaphore(Config.MAX_PENDING_PREVIEWS)
+
+
+@highlight_bp.before_request
+def _reject_oversized_body():
+    """
+    Refuse oversized bodies. A declared length is checked before any of the body is read;
+    a chunked body (no declared length) is read here, at most one byte past the limit, and
+    kept for _load_json, so no more than the limit is ever buffered.
+    """
+    limit = Config.MAX_HIGHLIGHT_REQUEST_BYTES
+    if request.content_length is not None:
+        if request.content_length > limit:
+            return ojsonify({'error': 'Request body too large'}, 413)
+    elif 'chunked' in request.headers.get('Transfer-Encoding', '').lower():
+        raw = request.stream.read(limit + 1)
+        if len(raw) > limit:
+            return ojsonify({'error': 'Request body too large'}, 413)
+        g._raw_body = raw
+
+
+@highlight_bp.before_request
+def _log_auth_once():
+    """Log auth info for the Chrome extension once per request, for every highlight route."""
+    if getattr(g, '_auth_logged', False):
+        return
+    g._auth_logged = True
+    
+    project_id = request.args.get('project_id')
+    if project_id is None:
+        # Parsed body is memoized on g, so the route's _load_json() doesn't re-parse
+        body = _load_json()
+        if isinstance(body, dict):
+            project_id = body.get('project_id')
+    log_auth_info(project_id)
+
+
+def _load_json():
+    """
+    Parse the raw request body with orjson, once per request.
+    
+    Returns None for an empty or malformed body (routes answer 'No data provided').
+    """
+    if '_json_body' not in g:
+        raw = g.pop('_raw_body', None)
+        if raw is None:
+            raw = request.get_data(cache=False)
+        try:
+            g._json_body = orjson.loads(raw) if raw else None
+        except orjson.JSONDecodeError:
+            g._json_body = None
+    return g._json_body
+
+
+# project_id / highlight_id are uuid4 strings; reject anything else before touching the DB
+_UUID_RE = re.compile(r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}')
+
+
+def _is_uuid(value):
+    """Return True if value is a UUID string."""
+    return isinstance(value, str) and _UUID_RE.fullmatch(value) is not None
+
+
+def _make_validator(fields):
+    """Build a required-field check for a fixed field list; returns the first missing field or None."""
+    fields = tuple(fields)
+    
+    def validate(data):
+        get = data.get
+        for field in fields:
+            if not get(field):
+                return field
+        return None
+    
+    return validate
+
+
+_source_validator = _make_validator(['project_id', 'source_url'])
+
+
+# Request bodies for the save/delete hot paths, validated in C by msgspec
+_NonEmptyStr = Annotated[str, msgspec.Meta(min_length=1)]
+
+
+class SaveHighlightBody(msgspec.Struct):
+    project_id: _NonEmptyStr
+    source_url: _NonEmptyStr
+    page_title: _NonEmptyStr
+    text: _NonEmptyStr
+    note: Optional[str] = None
+    tags: list[str] = []
+    preview_data: Optional[dict] = None
+    timestamp: Optional[str] = None  # Browser's local time as an ISO string
+
+
+class DeleteHighlightBody(msgspec.Struct):
+    project_id: _NonEmptyStr
+    source_url: _NonEmptyStr
+    highlight_id: _NonEmptyStr
+
+
+# Top highlights kept per source on limited (initial load) requests
+_HIGHLIGHTS_PER_SOURCE = 2
+
+# Tags kept per highlight (bounds document size)
+_MAX_TAGS = 32
+
+# Static success bodies; only the (ASCII uuid) highlight_id varies, so no JSON encoding is needed
+_SAVE_PREFIX = b'{"success":true,"highlight_id":"'
+_SAVE_SUFFIX = b'","message":"Highlight saved successfully"}'
+_DELETE_BODY = b'{"success":true,"message":"Highlight deleted successfully"}'
+
+
+def _save_response(highlight_id):
+    """201 response for a saved highlight, built from the byte template."""
+    return current_app.response_class(
+        _SAVE_PREFIX + highlight_id.encode('ascii') + _SAVE_SUFFIX,
+        status=201,
+        mimetype='application/json'
+    )
+
 
 def generate_cropped_preview(preview_data, scale_factor=0.3):
     """
     Generate a cropped preview image with 1:2 aspect ratio (height:width), centered on selection.
     
     Process:
-    1. Scale down screenshot by fixed factor (default 0.3 = 30% of original size)
+    1. Target a fixed scale factor (default 0.3 = 30% of original size)
     2. Crop with 1:2 aspect ratio (height:width): full width, height = width/2, centered on selection
     3. No horizontal cropping - preserves full viewport width
+    The crop is applied during the resize, so only the kept strip of the screenshot is resampled.
     
     Args:
-        preview_data: dict with 'screenshot' (base64) and 'selection_rect'
+        preview_data: dict with 'screenshot' (base64 PNG or JPEG), 'selection_rect' and optional 'mime'
         scale_factor: Scaling factor (default 0.3 = 30% of original size)
     
     Returns:
-        bytes: JPEG image bytes, or None if processing fails
+        io.BytesIO: JPEG image positioned at the start, or None if processing fails
     """
     if not PIL_AVAILABLE:
         return None
@@ -52,96 +223,183 @@ def generate_cropped_preview(preview_data, scale_factor=0.3):
         return None
     
     try:
-        # Decode the screenshot
+        # Decode the screenshot (accept a full data URL as well as bare base64)
         screenshot_base64 = preview_data['screenshot']
-        img_bytes = base64.b64decode(screenshot_base64)
-        img = Image.open(io.BytesIO(img_bytes))
-        original_width, original_height = img.size
-        
-        selection_rect = preview_data.get('selection_rect', {})
-        viewport_width = selection_rect.get('viewport_width', original_width)
-        viewport_height = selection_rect.get('viewport_height', original_height)
-        
-        logger.debug(f"Original screenshot: {original_width}x{original_height}")
-        logger.debug(f"Viewport: {viewport_width}x{viewport_height}")
-        
-        # Calculate device pixel ratio
-        device_pixel_ratio = original_width / viewport_width if viewport_width > 0 else 1
-        logger.debug(f"Device pixel ratio: {device_pixel_ratio}")
+        if screenshot_base64.startswith('data:'):
+            screenshot_base64 = screenshot_base64.partition(',')[2]
+        if len(screenshot_base64) > Config.MAX_SCREENSHOT_B64:
+            logger.debug("Screenshot too large to preview: %s base64 chars", len(screenshot_base64))
+            return None
         
-        # STEP 1: Scale down by fixed factor (0.3 = 30% of original size)
-        scaled_width = int(original_width * scale_factor)
-        scaled_height = int(original_height * scale_factor)
-        img = img.resize((scaled_width, scaled_height), Image.LANCZOS)
-        logger.debug(f"Scaled screenshot to: {scaled_width}x{scaled_height} (scale_factor: {scale_factor:.3f}, {scale_factor*100:.1f}% of original)")
-        
-        # STEP 2: Calculate crop with 1:2 aspect ratio (height:width)
-        # Get selection position in viewport coordinates
-        sel_x = selection_rect.get('x', 0)
-        sel_y = selection_rect.get('y', 0)
-        sel_width = selection_rect.get('width', 100)
-        sel_height = selection_rect.get('height', 20)
-        scroll_x = selection_rect.get('scroll_x', 0)
-        scroll_y = selection_rect.get('scroll_y', 0)
-        
-        # Selection center relative to viewport (viewport coordinates)
-        sel_viewport_x = sel_x - scroll_x
-        sel_viewport_y = sel_y - scroll_y
-        center_y_viewport = sel_viewport_y + sel_height / 2
+        # The decoder takes the ASCII str directly (no intermediate encode). The compressed bytes
+        # and the full-size decoded image are only referenced inside this block, so both are
+        # released as soon as the cropped, downscaled copy exists.
+        with Image.open(io.BytesIO(_b64decode(screenshot_base64))) as src:
+            original_width, original_height = src.size
+            
+            # Only the vertical selection geometry matters: the crop always spans the full width
+            rect = preview_data.get('selection_rect') or {}
+            get = rect.get
+            viewport_width, viewport_height = get('viewport_width', original_width), get('viewport_height', original_height)
+            sel_y, sel_height, scroll_y = get('y', 0), get('height', 20), get('scroll_y', 0)
+            
+            logger.debug("Original screenshot: %sx%s", original_width, original_height)
+            logger.debug("Viewport: %sx%s", viewport_width, viewport_height)
+            
+            # Calculate device pixel ratio
+            device_pixel_ratio = original_width / viewport_width if viewport_width > 0 else 1
+            logger.debug("Device pixel ratio: %s", device_pixel_ratio)
+            
+            # STEP 1: Target size after scaling down by fixed factor (0.3 = 30% of original size),
+            # rounded down (never up, so small screenshots are not stretched) to a multiple of
+            # 32 wide and 16 high: the JPEG encoder then works on whole 16x16 MCUs (4:2:0
+            # subsampling) and the half-width crop below is a multiple of 16 too. Images too
+            # small to round keep their exact scaled size
+            scaled_width = max(1, int(original_width * scale_factor))
+            scaled_width = (scaled_width & ~31) or scaled_width
+            scaled_height = max(1, int(original_height * scale_factor))
+            scaled_height = (scaled_height & ~15) or scaled_height
+            
+            # STEP 2: Calculate crop with 1:2 aspect ratio (height:width), in scaled coordinates.
+            # Selection center relative to the viewport, converted to original screenshot
+            # coordinates (device pixel ratio), then to the (rounded) vertical scale
+            center_y_scaled = (
+                (sel_y - scroll_y + sel_height * 0.5) * device_pixel_ratio * scaled_height / original_height
+            )
+            
+            # Crop dimensions: 1:2 aspect ratio (height:width)
+            # Height = width / 2
+            crop_height = max(1, scaled_width // 2)  # Half of width (1:2 ratio)
+            
+            # Safety check: if scaled height is less than crop height, use scaled height
+            if crop_height > scaled_height:
+                logger.debug("WARNING: Crop height %s exceeds scaled height %s, using scaled height", crop_height, scaled_height)
+                crop_height = scaled_height
+            
+            # Crop area: full width, height = width/2, centered vertically on selection,
+            # clamped to [0, scaled_height - crop_height] so bottom never exceeds scaled_height
+            max_top = scaled_height - crop_height
+            top = center_y_scaled - crop_height // 2
+            top = 0 if top < 0 else int(max_top if top > max_top else top)
+            left = 0
+            right = scaled_width  # Full width
+            bottom = top + crop_height
+            
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Crop: left=%s, top=%s, right=%s, bottom=%s (width=%s, height=%s, aspect_ratio=%.2f:1)",
+                    left, top, right, bottom, right - left, bottom - top, (right - left) / (bottom - top)
+                )
+            
+            if src.format == 'JPEG':
+                # Let libjpeg decode at the nearest 1/2, 1/4 or 1/8 scale at or above the target,
+                # so LANCZOS only resamples the small residual factor
+                src.draft('RGB', (scaled_width, scaled_height))
+            
+            # STEP 3: Crop and resize in one pass. The crop box is mapped back to source pixels
+            # (which may be draft-reduced), so only the kept strip is ever resampled.
+            # reducing_gap: integer box-reduce first, then the configured filter (LANCZOS by
+            # default) only finishes the last <2x step on a much smaller intermediate
+            if src.size == (scaled_width, scaled_height):
+                # draft() already decoded at exactly the target size: nothing left to resample
+                cropped = src.crop((left, top, right, bottom))
+            else:
+                y_ratio = src.height / scaled_height
+                cropped = src.resize(
+                    (right - left, bottom - top),
+                    _PREVIEW_RESAMPLE,
+                    box=(0, top * y_ratio, src.width, bottom * y_ratio),
+                    reducing_gap=Config.PREVIEW_REDUCING_GAP
+                )
+        final_width, final_height = cropped.size
         
-        # Convert viewport coordinates to scaled screenshot coordinates
-        # First convert viewport coords to original screenshot coords, then apply scale
-        center_y_original = center_y_viewport * device_pixel_ratio
-        center_y_scaled = center_y_original * scale_factor
+        logger.debug("Final cropped image: %sx%s", final_width, final_height)
         
-        # Crop dimensions: 1:2 aspect ratio (height:width)
-        # Height = width / 2
-        crop_width = scaled_width  # Full width
-        crop_height = int(scaled_width / 2)  # Height is half of width (1:2 ratio)
+        # Convert to JPEG bytes (JPEG is much smaller than PNG for screenshots)
+        # Convert to RGB if needed (JPEG doesn't support transparency). captureVisibleTab
+        # screenshots are fully opaque, so dropping the alpha band matches compositing
+        # onto white without the extra canvas and masked paste.
+        if cropped.mode != 'RGB':
+            cropped = cropped.convert('RGB')
         
-        # Safety check: if scaled height is less than crop height, use scaled height
-        if crop_height > scaled_height:
-            crop_height = scaled_height
-            logger.debug(f"WARNING: Crop height {crop_height} exceeds scaled height {scaled_height}, using scaled height")
+        # Encode as JPEG with quality 85 (good balance between quality and file size).
+        # No Huffman optimization pass: previews are small thumbnails, latency matters more.
+        # 4:2:0 chroma subsampling halves the chroma data with no visible loss on screenshots
+        # (simplejpeg defaults to 4:4:4, so spell it out for both encoders).
+        # Either way the JPEG ends up in a BytesIO without copying (BytesIO shares the
+        # bytes object it is initialized with), ready to hand to S3 as-is.
+        if SIMPLEJPEG_AVAILABLE:
+            buffer = io.BytesIO(simplejpeg.encode_jpeg(
+                np.asarray(cropped), quality=85, colorspace='RGB',
+                colorsubsampling='420', fastdct=True
+            ))
+        else:
+            buffer = io.BytesIO()
+            cropped.save(buffer, format='JPEG', quality=85, optimize=False, subsampling=2)
+            buffer.seek(0)
         
-        # Crop area: full width, height = width/2, centered vertically on selection
-        left = 0
-        top = max(0, min(scaled_height - crop_height, center_y_scaled - crop_height // 2))
-        right = scaled_width  # Full width
-        bottom = min(scaled_height, top + crop_height)
+        logger.debug("Final preview size: %s bytes (JPEG format)", buffer.getbuffer().nbytes)
         
-        logger.debug(f"Crop: left={left}, top={top}, right={right}, bottom={bottom} (width={right-left}, height={bottom-top}, aspect_ratio={((right-left)/(bottom-top)):.2f}:1)")
+        return buffer
         
-        # STEP 3: Crop the image (1:2 aspect ratio)
-        cropped = img.crop((int(left), int(top), int(right), int(bottom)))
-        final_width, final_height = cropped.size
+    except Exception as e:
+        logger.debug("Error generating cropped preview: %s", e, exc_info=True)
+        return None
+
+
+def _process_highlight_preview(user_id, project_id, source_url, highlight_id, preview_data):
+    """
+    Background job: crop the screenshot, upload it to S3 and attach the URL to the highlight.
+    
+    Invalidates the highlight caches and sends a preview_ready SSE event so the frontend
+    reloads the highlight with its preview.
+    """
+    try:
+        if isinstance(preview_data, dict) and logger.isEnabledFor(logging.DEBUG):
+            screenshot_len = len(preview_data.get('screenshot', '')) if preview_data.get('screenshot') else 0
+            logger.debug("[HIGHLIGHT] Screenshot base64 length: %s", screenshot_len)
+            logger.debug("[HIGHLIGHT] Selection rect: %s", preview_data.get('selection_rect'))
         
-        logger.debug(f"Final cropped image: {final_width}x{final_height}")
+        # Generate cropped preview image (returns a BytesIO positioned at the start)
+        image = generate_cropped_preview(preview_data)
+        if not image:
+            logger.debug("[HIGHLIGHT] Failed to generate preview image")
+            return
+        logger.debug("[HIGHLIGHT] Generated preview image: %s bytes", image.getbuffer().nbytes)
         
-        # Convert to JPEG bytes (JPEG is much smaller than PNG for screenshots)
-        buffer = io.BytesIO()
-        # Convert RGBA to RGB if needed (JPEG doesn't support transparency)
-        if cropped.mode in ('RGBA', 'LA', 'P'):
-            # Create a white background for transparency
-            rgb_img = Image.new('RGB', cropped.size, (255, 255, 255))
-            if cropped.mode == 'P':
-                cropped = cropped.convert('RGBA')
-            rgb_img.paste(cropped, mask=cropped.split()[-1] if cropped.mode in ('RGBA', 'LA') else None)
-            cropped = rgb_img
+        if not S3Service.is_available():
+            logger.debug("[HIGHLIGHT] S3 not configured, preview will not be saved")
+            return
         
-        # Save as JPEG with quality 85 (good balance between quality and file size)
-        cropped.save(buffer, format='JPEG', quality=85, optimize=True)
-        image_bytes = buffer.getvalue()
+        preview_image_url = S3Service.upload_highlight_image(
+            image=image,
+            user_id=user_id,
+            highlight_id=highlight_id
+        )
+        if not preview_image_url:
+            logger.debug("[HIGHLIGHT] S3 upload failed, preview will not be saved")
+            return
+        logger.debug("[HIGHLIGHT] Uploaded to S3: %s", preview_image_url)
         
-        logger.debug(f"Final preview size: {len(image_bytes)} bytes (JPEG format)")
+        if not HighlightModel.update_preview_url(user_id, project_id, source_url, highlight_id, preview_image_url):
+            logger.debug("[HIGHLIGHT] Highlight %s no longer exists, preview not attached", highlight_id)
+            return
         
-        return image_bytes
+        # Covers the list, per-source, limit-variant and search caches
+        invalidate_highlight_caches(user_id, project_id)
         
+        SSEService.broadcast_to_user(
+            user_id=user_id,
+            event_type='preview_ready',
+            data={
+                'project_id': project_id,
+                'highlight_id': highlight_id,
+                'source_url': source_url,
+                'preview_image_url': preview_image_url
+            }
+        )
     except Exception as e:
-        logger.debug(f"Error generating cropped preview: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
+        logger.error("[HIGHLIGHT] Preview processing failed for %s: %s", highlight_id, e, exc_info=True)
 
 
 @highlight_bp.route('', methods=['POST'])
@@ -157,79 +415,48 @@ def save_highlight():
         text: string (required),
         note: string (optional),
         tags: [string] (optional),
-        preview_data: { screenshot: base64, selection_rect: {...} } (optional)
+        preview_data: { screenshot: base64, mime: string, selection_rect: {...} } (optional)
     }
     
     Returns: { success: true, highlight_id: string, message: string }
     """
     user_id = get_user_id_from_token()
     if not user_id:
-        return jsonify({'error': 'Unauthorized'}), 401
+        return ojsonify({'error': 'Unauthorized'}, 401)
     
-    data = request.get_json()
+    data = _load_json()
     if not data:
-        return jsonify({'error': 'No data provided'}), 400
-    
-    # Validate required fields
-    required_fields = ['project_id', 'source_url', 'page_title', 'text']
-    for field in required_fields:
-        if not data.get(field):
-            return jsonify({'error': f'Missing required field: {field}'}), 400
+        return ojsonify({'error': 'No data provided'}, 400)
     
-    project_id = data['project_id']
-    source_url = data['source_url']
-    page_title = data['page_title']
-    text = data['text']
-    note = data.get('note')
-    tags = data.get('tags', [])
-    preview_data = data.get('preview_data')
-    timestamp_str = data.get('timestamp')  # Get timestamp from browser's local time
-    
-    # Log auth info for Chrome extension
-    log_auth_info(project_id)
+    # Validate required fields and types in one pass
+    try:
+        body = msgspec.convert(data, SaveHighlightBody)
+    except msgspec.ValidationError as e:
+        return ojsonify({'error': str(e)}, 400)
+    
+    project_id = body.project_id
+    source_url = body.source_url
+    page_title = body.page_title
+    text = body.text
+    note = body.note
+    tags = body.tags
+    if tags:
+        # Strip, drop blanks and de-duplicate (order kept), capped to bound doc size
+        tags = list(dict.fromkeys(t.strip() for t in tags if t.strip()))[:_MAX_TAGS]
+    preview_data = body.preview_data
+    timestamp_str = body.timestamp  # Get timestamp from browser's local time
+    
+    if not _is_uuid(project_id):
+        return ojsonify({'error': 'Invalid project_id'}, 400)
     
     # Validate project belongs to user
-    project = ProjectModel.get_project(project_id)
-    if not project or project.get('user_id') != user_id:
-        return jsonify({'error': 'Project not found or access denied'}), 404
+    if not project_belongs_to(project_id, user_id):
+        return ojsonify({'error': 'Project not found or access denied'}, 404)
     
     # Generate a highlight_id upfront (needed for S3 key)
     import uuid
     highlight_id = str(uuid.uuid4())
     
-    # Process preview data to generate cropped preview image
-    preview_image_url = None
-    if preview_data:
-        logger.debug(f"[HIGHLIGHT] Received preview_data with keys: {preview_data.keys() if isinstance(preview_data, dict) else 'not a dict'}")
-        if isinstance(preview_data, dict):
-            screenshot_len = len(preview_data.get('screenshot', '')) if preview_data.get('screenshot') else 0
-            logger.debug(f"[HIGHLIGHT] Screenshot base64 length: {screenshot_len}")
-            logger.debug(f"[HIGHLIGHT] Selection rect: {preview_data.get('selection_rect')}")
-        
-        # Generate cropped preview image (returns bytes)
-        image_bytes = generate_cropped_preview(preview_data)
-        
-        if image_bytes:
-            logger.debug(f"[HIGHLIGHT] Generated preview image: {len(image_bytes)} bytes")
-            
-            # Upload to S3 if available
-            if S3Service.is_available():
-                preview_image_url = S3Service.upload_highlight_image(
-                    image_bytes=image_bytes,
-                    user_id=user_id,
-                    highlight_id=highlight_id
-                )
-                if preview_image_url:
-                    logger.debug(f"[HIGHLIGHT] Uploaded to S3: {preview_image_url}")
-                else:
-                    logger.debug("[HIGHLIGHT] S3 upload failed, preview will not be saved")
-            else:
-                logger.debug("[HIGHLIGHT] S3 not configured, preview will not be saved")
-        else:
-            logger.debug("[HIGHLIGHT] Failed to generate preview image")
-    else:
-        logger.debug("[HIGHLIGHT] No preview_data received")
-    
     # Parse timestamp if provided (from browser's local time as ISO string)
     timestamp = None
     if timestamp_str:
@@ -247,22 +474,58 @@ def save_highlight():
                     # Convert timezone-aware to naive UTC
                     timestamp = timestamp.astimezone(datetime.timezone.utc).replace(tzinfo=None)
         except (ValueError, AttributeError, TypeError) as e:
-            logger.debug(f"[HIGHLIGHT] Failed to parse timestamp '{timestamp_str}': {e}")
+            logger.debug("[HIGHLIGHT] Failed to parse timestamp '%s': %s", timestamp_str, e)
             # Will fall back to server time in save_highlight
     
-    # Save highlight with S3 URL
-    saved_highlight_id = HighlightModel.save_highlight(
-        user_id=user_id,
-        project_id=project_id,
-        source_url=source_url,
-        page_title=page_title,
-        highlight_text=text,
-        note=note,
-        tags=tags,
-        preview_image_url=preview_image_url,
-        highlight_id=highlight_id,  # Pass the pre-generated ID
-        timestamp=timestamp  # Pass timestamp from browser if available
-    )
+    # Collapse duplicate submissions of the same highlight fired within a couple of seconds,
+    # including ones that arrive while the first save is still in flight
+    dedupe_key = hashlib.blake2b(
+        f"{user_id}|{project_id}|{source_url}|{text}".encode('utf-8'), digest_size=16
+    ).digest()
+    with _recent_saves_lock:
+        pending = _recent_saves.get(dedupe_key)
+        owns_claim = pending is None
+        if owns_claim:
+            pending = Future()
+            _recent_saves[dedupe_key] = pending
+    if not owns_claim:
+        try:
+            recent_highlight_id = pending.result(timeout=_DEDUPE_WAIT_SECONDS)
+        except Exception:
+            # The first save failed or is stuck; save this one on its own
+            recent_highlight_id = None
+        if recent_highlight_id:
+            logger.debug("[HIGHLIGHT] Duplicate save collapsed onto %s", recent_highlight_id)
+            return _save_response(recent_highlight_id)
+    
+    # Save highlight; the preview URL is filled in by the background preview job
+    try:
+        saved_highlight_id = HighlightModel.save_highlight(
+            user_id=user_id,
+            project_id=project_id,
+            source_url=source_url,
+            page_title=page_title,
+            highlight_text=text,
+            note=note,
+            tags=tags,
+            preview_image_url=None,
+            highlight_id=highlight_id,  # Pass the pre-generated ID
+            timestamp=timestamp  # Pass timestamp from browser if available
+        )
+    except Exception as e:
+        if owns_claim:
+            # Release the claim so waiting duplicates (and retries) save for themselves
+            with _recent_saves_lock:
+                if _recent_saves.get(dedupe_key) is pending:
+                    del _recent_saves[dedupe_key]
+            pending.set_exception(e)
+        raise
+    
+    if owns_claim:
+        with _recent_saves_lock:
+            # Re-set so the dedupe window runs from completion, not from the claim
+            _recent_saves[dedupe_key] = pending
+        pending.set_result(saved_highlight_id)
     
     # Index highlight for semantic search (Phase I)
     try:
@@ -279,19 +542,13 @@ def save_highlight():
             project_id=project_id,
             source_url=source_url
         )
-        logger.debug(f"[VECTORIZATION] Successfully indexed highlight {saved_highlight_id}")
+        logger.debug("[VECTORIZATION] Successfully indexed highlight %s", saved_highlight_id)
     except Exception as vec_error:
-        logger.error(f"[VECTORIZATION] Error indexing highlight: {vec_error}")
-        import traceback
-        traceback.print_exc()
+        logger.error("[VECTORIZATION] Error indexing highlight: %s", vec_error, exc_info=True)
         # Don't fail highlight save if vectorization fails
     
-    # Invalidate cache
-    redis_service = get_redis_service()
-    redis_service.delete(f"cache:highlights:{user_id}:{project_id}")
-    redis_service.delete(f"cache:highlights:{user_id}:{project_id}:{source_url}")
-    logger.debug(f"[REDIS] Invalidating cache: cache:highlights:{user_id}:{project_id}")
-    logger.debug(f"[REDIS] Cache invalidated successfully")
+    # Invalidate the list, per-source, limit-variant and search caches
+    invalidate_highlight_caches(user_id, project_id)
     
     # Send SSE event to notify frontend that highlight was saved
     try:
@@ -304,18 +561,28 @@ def save_highlight():
                 'source_url': source_url
             }
         )
-        logger.debug(f"[SSE] Sent highlight_saved event for highlight {saved_highlight_id} in project {project_id}")
+        logger.debug("[SSE] Sent highlight_saved event for highlight %s in project %s", saved_highlight_id, project_id)
     except Exception as sse_error:
-        logger.debug(f"[SSE] Failed to send highlight_saved event: {sse_error}")
+        logger.debug("[SSE] Failed to send highlight_saved event: %s", sse_error)
     
-    logger.debug(f"Highlight saved: {saved_highlight_id} for project {project_id}" + 
-          (f" (with S3 preview: {preview_image_url})" if preview_image_url else " (no preview)"))
+    # Crop + upload the preview off the request thread; a preview_ready SSE event follows
+    preview_status = "no preview"
+    if not preview_data:
+        logger.debug("[HIGHLIGHT] No preview_data received")
+    elif _preview_slots.acquire(blocking=False):
+        future = _preview_executor.submit(
+            _process_highlight_preview, user_id, project_id, source_url, saved_highlight_id, preview_data
+        )
+        future.add_done_callback(lambda _: _preview_slots.release())
+        preview_status = "preview queued"
+    else:
+        logger.warning("[HIGHLIGHT] Preview backlog full (%s pending), skipping preview for %s",
+                       Config.MAX_PENDING_PREVIEWS, saved_highlight_id)
+        preview_status = "preview skipped"
     
-    return jsonify({
-        'success': True,
-        'highlight_id': saved_highlight_id,
-        'message': 'Highlight saved successfully'
-    }), 201
+    logger.info("Highlight saved: %s for project %s (%s)", saved_highlight_id, project_id, preview_status)
+    
+    return _save_response(saved_highlight_id)
 
 
 @highlight_bp.route('', methods=['GET'])
@@ -328,115 +595,104 @@ def get_highlights():
         project_id: string (required)
         source_url: string (optional)
         limit: int (optional) - limit number of results (for initial load)
+        format: 'ndjson' (optional) - stream one highlight document per line instead
     
     Returns: { highlights: [...] }
     """
     user_id = get_user_id_from_token()
     if not user_id:
-        return jsonify({'error': 'Unauthorized'}), 401
+        return ojsonify({'error': 'Unauthorized'}, 401)
     
     project_id = request.args.get('project_id')
     source_url = request.args.get('source_url')
     limit = request.args.get('limit', type=int)
     
     if not project_id:
-        return jsonify({'error': 'project_id is required'}), 400
-    
-    # Log auth info for Chrome extension
-    log_auth_info(project_id)
+        return ojsonify({'error': 'project_id is required'}, 400)
+    if not _is_uuid(project_id):
+        return ojsonify({'error': 'Invalid project_id'}, 400)
     
-    # Validate project belongs to user
-    project = ProjectModel.get_project(project_id)
-    if not project or project.get('user_id') != user_id:
-        return jsonify({'error': 'Project not found or access denied'}), 404
+    # Initial load (limit set) only needs the most recent highlights of each source,
+    # trimmed server-side
+    highlights_per_source = _HIGHLIGHTS_PER_SOURCE if limit else None
     
-    # Generate cache key (include limit in cache key if specified)
+    # Conditional GET: the version token is dropped on every highlight mutation in this project
+    etag_version = redis_service.get_or_create_token(
+        highlights_etag_key(user_id, project_id), ttl=Config.REDIS_TTL_METADATA
+    )
+    if etag_version and request.if_none_match.contains_weak(etag_version):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag_version, weak=True)
+        return response
+    
+    # Opt-in NDJSON: stream one document per line straight off the cursor (bypasses Redis)
+    if request.args.get('format') == 'ndjson':
+        cursor = HighlightModel.stream_highlights_cursor(
+            user_id=user_id,
+            project_id=project_id,
+            source_url=source_url,
+            limit=limit,
+            highlights_per_source=highlights_per_source
+        )
+        
+        def generate():
+            with cursor:
+                for h_doc in cursor:
+                    yield json_dumps(h_doc) + b'\n'
+        
+        response = current_app.response_class(generate(), mimetype='application/x-ndjson')
+        if etag_version:
+            response.set_etag(etag_version, weak=True)
+        return response
+    
+    # Generate cache key (include limit in cache key if specified); every variant is recorded
+    # in the project's highlights index, which every highlights-collection writer (web and
+    # PDF routes, extraction) unlinks via invalidate_highlight_caches
     if source_url:
         cache_key = f"cache:highlights:{user_id}:{project_id}:{source_url}"
-    elif limit:
-        cache_key = f"cache:highlights:{user_id}:{project_id}:limit:{limit}"
     else:
         cache_key = f"cache:highlights:{user_id}:{project_id}"
+    if limit:
+        cache_key = f"{cache_key}:limit:{limit}"
     
-    # Check Redis cache first (only if no limit specified, to avoid caching limited results)
-    redis_service = get_redis_service()
-    cached_data = None
-    if not limit:
-        cached_data = redis_service.get(cache_key)
-    
-    if cached_data is not None:
-        logger.debug(f"[REDIS] get_highlights: Cache hit")
-        # Fix URLs in cached data before returning
-        if 'highlights' in cached_data:
-            for h_doc in cached_data['highlights']:
-                if 'highlights' in h_doc:
-                    for h in h_doc['highlights']:
-                        if 'preview_image_url' in h and h['preview_image_url']:
-                            h['preview_image_url'] = S3Service.fix_s3_url_region(h['preview_image_url'])
-        return jsonify(cached_data), 200
+    # Check Redis cache first (stores the serialized response body, returned as-is)
+    cached_body = redis_service.get_bytes(cache_key)
     
-    # Cache miss - fetch from MongoDB
-    logger.debug(f"[REDIS] get_highlights: Cache key: {cache_key}")
-    logger.debug(f"[REDIS] get_highlights: Cache miss, fetching from MongoDB")
+    if cached_body is not None:
+        logger.debug("[REDIS] get_highlights: Cache hit")
+        response = json_bytes_response(cached_body)
+        if etag_version:
+            response.set_etag(etag_version, weak=True)
+        return response
     
-    # Get highlights based on filters
-    if source_url:
-        # Get highlights for specific URL
-        highlight_doc = HighlightModel.get_highlights_by_url(
-            user_id=user_id,
-            project_id=project_id,
-            source_url=source_url
-        )
-        highlights = [highlight_doc] if highlight_doc else []
-    else:
-        # Get highlights for project (with optional limit)
-        highlights = HighlightModel.get_highlights_by_project(
-            user_id=user_id,
-            project_id=project_id,
-            limit=limit
-        )
+    # Cache miss - fetch from MongoDB
+    logger.debug("[REDIS] get_highlights: Cache key: %s", cache_key)
+    logger.debug("[REDIS] get_highlights: Cache miss, fetching from MongoDB")
     
-    # Convert ObjectId to string for JSON serialization and fix URLs
-    # Also limit highlights per document if limit is specified (for initial load)
-    highlights_per_source = 2  # Top 2 highlights per source
-    for h_doc in highlights:
-        if '_id' in h_doc:
-            h_doc['_id'] = str(h_doc['_id'])
-        
-        # Explicitly serialize datetime fields to ISO format with 'Z' suffix for UTC
-        if 'created_at' in h_doc and h_doc['created_at']:
-            h_doc['created_at'] = h_doc['created_at'].isoformat() + 'Z'
-        if 'updated_at' in h_doc and h_doc['updated_at']:
-            h_doc['updated_at'] = h_doc['updated_at'].isoformat() + 'Z'
-        
-        # Limit highlights per document if limit is specified (for initial load)
-        if limit and 'highlights' in h_doc and h_doc['highlights']:
-            # Sort highlights by timestamp descending (most recent first)
-            # MongoDB returns datetime objects, which are directly comparable
-            sorted_highlights = sorted(
-                h_doc['highlights'],
-                key=lambda h: h.get('timestamp') or datetime.min,
-                reverse=True
-            )
-            # Take only top N highlights per source
-            h_doc['highlights'] = sorted_highlights[:highlights_per_source]
-        
-        # Fix preview_image_url and serialize timestamps in nested highlights array
-        if 'highlights' in h_doc:
-            for h in h_doc['highlights']:
-                if 'preview_image_url' in h and h['preview_image_url']:
-                    h['preview_image_url'] = S3Service.fix_s3_url_region(h['preview_image_url'])
-                if 'timestamp' in h and h['timestamp']:
-                    h['timestamp'] = h['timestamp'].isoformat() + 'Z'
+    # Get highlights based on filters; project ownership is checked in the same query
+    # (a missing or foreign project yields an empty list)
+    highlights = HighlightModel.get_highlights_authorized(
+        user_id=user_id,
+        project_id=project_id,
+        source_url=source_url,
+        limit=limit,
+        highlights_per_source=highlights_per_source
+    )
     
-    response_data = {'highlights': highlights}
+    # Datetimes are written as ISO 8601 UTC with a 'Z' suffix by the serializer
+    # (_id already arrives as a string from the aggregation)
+    body = json_dumps({'highlights': highlights})
     
-    # Cache the result (only if no limit specified)
-    if not limit:
-        redis_service.set(cache_key, response_data, ttl=Config.REDIS_TTL_DOCUMENTS)
-        logger.debug(f"[REDIS] get_highlights: Cached {len(highlights)} highlights")
+    # Cache the result
+    redis_service.set_bytes(
+        cache_key, body, ttl=Config.REDIS_TTL_DOCUMENTS, index=highlights_index_key(user_id, project_id)
+    )
+    logger.debug("[REDIS] get_highlights: Cached %s highlights", len(highlights))
     
-    return jsonify(response_data), 200
+    response = json_bytes_response(body)
+    if etag_version:
+        response.set_etag(etag_version, weak=True)
+    return response
 
 
 @highlight_bp.route('/search', methods=['GET'])
@@ -466,81 +722,55 @@ def search_highlights():
     """
     user_id = get_user_id_from_token()
     if not user_id:
-        return jsonify({'error': 'Unauthorized'}), 401
+        return ojsonify({'error': 'Unauthorized'}, 401)
     
     project_id = request.args.get('project_id')
     query = request.args.get('query', '').strip()
-    limit = request.args.get('limit', type=int) or 10
+    limit = max(request.args.get('limit', type=int) or 10, 1)
     
     if not project_id:
-        return jsonify({'error': 'project_id is required'}), 400
+        return ojsonify({'error': 'project_id is required'}, 400)
     
     if not query:
-        return jsonify({'highlights': []}), 200
+        return ojsonify({'highlights': []}, 200)
     
-    # Validate project belongs to user
-    project = ProjectModel.get_project(project_id)
-    if not project or project.get('user_id') != user_id:
-        return jsonify({'error': 'Project not found or access denied'}), 404
+    # Validate project belongs to user (cached per project/user)
+    if not project_belongs_to(project_id, user_id):
+        return ojsonify({'error': 'Project not found or access denied'}, 404)
     
-    # Generate cache key for search results (short TTL since searches are dynamic)
-    cache_key = f"cache:highlights:search:{user_id}:{project_id}:{query.lower()}:{limit}"
+    # Generate cache key for search results (short TTL since searches are dynamic);
+    # matching is case-insensitive, so queries differing only in case share an entry.
+    # The query is hashed to keep keys bounded, and keyed under the project prefix so
+    # highlight mutations unlink it with the list caches.
+    query_hash = hashlib.blake2b(query.lower().encode('utf-8'), digest_size=16).hexdigest()
+    cache_key = f"cache:highlights:{user_id}:{project_id}:search:{query_hash}:{limit}"
     
     # Check Redis cache first (short TTL for search results)
-    redis_service = get_redis_service()
-    cached_data = redis_service.get(cache_key)
-    
-    if cached_data is not None:
-        logger.debug(f"[REDIS] search_highlights: Cache hit for query: {query}")
-        # Fix URLs in cached data before returning
-        for h_doc in cached_data.get('highlights', []):
-            if 'highlights' in h_doc:
-                for h in h_doc['highlights']:
-                    if 'preview_image_url' in h and h['preview_image_url']:
-                        h['preview_image_url'] = S3Service.fix_s3_url_region(h['preview_image_url'])
-        return jsonify(cached_data), 200
+    cached_body = redis_service.get_bytes(cache_key)
     
-    # Cache miss - search MongoDB
-    logger.debug(f"[SEARCH] Searching highlights for query: '{query}' in project {project_id}")
+    if cached_body is not None:
+        logger.debug("[REDIS] search_highlights: Cache hit for query: %s", query)
+        return json_bytes_response(cached_body)
     
-    # Search web highlights
-    web_results = HighlightModel.search_highlights(
-        user_id=user_id,
-        project_id=project_id,
-        query=query,
-        limit=limit
-    )
+    # Cache miss - search MongoDB
+    logger.debug("[SEARCH] Searching highlights for query: '%s' in project %s", query, project_id)
     
-    # Search PDF highlights
-    pdf_results = PDFDocumentModel.search_highlights(
+    # Web and PDF sources are merged, sorted by updated_at and limited in one aggregation
+    # (we want up to limit total sources, not limit per type; _id arrives as a string)
+    all_results = HighlightModel.search_all(
         user_id=user_id,
         project_id=project_id,
         query=query,
         limit=limit
     )
     
-    # Combine results (we want up to limit total sources, not limit per type)
-    # Sort by updated_at descending
-    all_results = web_results + pdf_results
-    all_results.sort(key=lambda x: x.get('updated_at') or datetime.min, reverse=True)
-    all_results = all_results[:limit]
-    
-    # Convert ObjectId to string and fix URLs
-    for h_doc in all_results:
-        if '_id' in h_doc:
-            h_doc['_id'] = str(h_doc['_id'])
-        if 'highlights' in h_doc:
-            for h in h_doc['highlights']:
-                if 'preview_image_url' in h and h['preview_image_url']:
-                    h['preview_image_url'] = S3Service.fix_s3_url_region(h['preview_image_url'])
-    
-    response_data = {'highlights': all_results}
+    body = json_dumps({'highlights': all_results})
     
     # Cache the result with short TTL (30 seconds for search results)
-    redis_service.set(cache_key, response_data, ttl=30)
-    logger.debug(f"[REDIS] search_highlights: Cached {len(all_results)} results for query: {query}")
+    redis_service.set_bytes(cache_key, body, ttl=30, index=highlights_index_key(user_id, project_id))
+    logger.debug("[REDIS] search_highlights: Cached %s results for query: %s", len(all_results), query)
     
-    return jsonify(response_data), 200
+    return json_bytes_response(body)
 
 
 @highlight_bp.route('', methods=['DELETE'])
@@ -559,29 +789,30 @@ def delete_highlight():
     """
     user_id = get_user_id_from_token()
     if not user_id:
-        return jsonify({'error': 'Unauthorized'}), 401
+        return ojsonify({'error': 'Unauthorized'}, 401)
     
-    data = request.get_json()
+    data = _load_json()
     if not data:
-        return jsonify({'error': 'No data provided'}), 400
+        return ojsonify({'error': 'No data provided'}, 400)
     
-    # Validate required fields
-    required_fields = ['project_id', 'source_url', 'highlight_id']
-    for field in required_fields:
-        if not data.get(field):
-            return jsonify({'error': f'Missing required field: {field}'}), 400
+    # Validate required fields and types in one pass
+    try:
+        body = msgspec.convert(data, DeleteHighlightBody)
+    except msgspec.ValidationError as e:
+        return ojsonify({'error': str(e)}, 400)
     
-    project_id = data['project_id']
-    source_url = data['source_url']
-    highlight_id = data['highlight_id']
+    project_id = body.project_id
+    source_url = body.source_url
+    highlight_id = body.highlight_id
     
-    # Log auth info for Chrome extension
-    log_auth_info(project_id)
+    if not _is_uuid(project_id):
+        return ojsonify({'error': 'Invalid project_id'}, 400)
+    if not _is_uuid(highlight_id):
+        return ojsonify({'error': 'Invalid highlight_id'}, 400)
     
     # Validate project belongs to user
-    project = ProjectModel.get_project(project_id)
-    if not project or project.get('user_id') != user_id:
-        return jsonify({'error': 'Project not found or access denied'}), 404
+    if not project_belongs_to(project_id, user_id):
+        return ojsonify({'error': 'Project not found or access denied'}, 404)
     
     # Delete highlight
     success = HighlightModel.delete_highlight(
@@ -592,19 +823,12 @@ def delete_highlight():
     )
     
     if success:
-        # Invalidate cache
-        redis_service = get_redis_service()
-        redis_service.delete(f"cache:highlights:{user_id}:{project_id}")
-        redis_service.delete(f"cache:highlights:{user_id}:{project_id}:{source_url}")
-        logger.debug(f"[REDIS] Invalidating cache: cache:highlights:{user_id}:{project_id}")
-        logger.debug(f"[REDIS] Cache invalidated successfully")
+        # Invalidate the list, per-source, limit-variant and search caches
+        invalidate_highlight_caches(user_id, project_id)
         
-        return jsonify({
-            'success': True,
-            'message': 'Highlight deleted successfully'
-        }), 200
+        return current_app.response_class(_DELETE_BODY, status=200, mimetype='application/json')
     else:
-        return jsonify({'error': 'Highlight not found'}), 404
+        return ojsonify({'error': 'Highlight not found'}, 404)
 
 
 @highlight_bp.route('/archive', methods=['PUT'])
@@ -622,28 +846,23 @@ def archive_highlight():
     """
     user_id = get_user_id_from_token()
     if not user_id:
-        return jsonify({'error': 'Unauthorized'}), 401
+        return ojsonify({'error': 'Unauthorized'}, 401)
     
-    data = request.get_json()
+    data = _load_json()
     if not data:
-        return jsonify({'error': 'No data provided'}), 400
+        return ojsonify({'error': 'No data provided'}, 400)
     
     # Validate required fields
-    required_fields = ['project_id', 'source_url']
-    for field in required_fields:
-        if not data.get(field):
-            return jsonify({'error': f'Missing required field: {field}'}), 400
+    missing = _source_validator(data)
+    if missing:
+        return ojsonify({'error': f'Missing required field: {missing}'}, 400)
     
     project_id = data['project_id']
     source_url = data['source_url']
     
-    # Log auth info for Chrome extension
-    log_auth_info(project_id)
-    
-    # Validate project belongs to user
-    project = ProjectModel.get_project(project_id)
-    if not project or project.get('user_id') != user_id:
-        return jsonify({'error': 'Project not found or access denied'}), 404
+    # Validate project belongs to user (cached per project/user)
+    if not project_belongs_to(project_id, user_id):
+        return ojsonify({'error': 'Project not found or access denied'}, 404)
     
     # Archive highlight
     success = HighlightModel.archive_highlight(
@@ -653,19 +872,15 @@ def archive_highlight():
     )
     
     if success:
-        # Invalidate cache
-        redis_service = get_redis_service()
-        redis_service.delete(f"cache:highlights:{user_id}:{project_id}")
-        redis_service.delete(f"cache:highlights:{user_id}:{project_id}:{source_url}")
-        logger.debug(f"[REDIS] Invalidating cache: cache:highlights:{user_id}:{project_id}")
-        logger.debug(f"[REDIS] Cache invalidated successfully")
+        # Invalidate the list, per-source, limit-variant and search caches
+        invalidate_highlight_caches(user_id, project_id)
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'message': 'Highlight archived successfully'
-        }), 200
+        }, 200)
     else:
-        return jsonify({'error': 'Highlight not found'}), 404
+        return ojsonify({'error': 'Highlight not found'}, 404)
 
 
 @highlight_bp.route('/unarchive', methods=['PUT'])
@@ -683,28 +898,23 @@ def unarchive_highlight():
     """
     user_id = get_user_id_from_token()
     if not user_id:
-        return jsonify({'error': 'Unauthorized'}), 401
+        return ojsonify({'error': 'Unauthorized'}, 401)
     
-    data = request.get_json()
+    data = _load_json()
     if not data:
-        return jsonify({'error': 'No data provided'}), 400
+        return ojsonify({'error': 'No data provided'}, 400)
     
     # Validate required fields
-    required_fields = ['project_id', 'source_url']
-    for field in required_fields:
-        if not data.get(field):
-            return jsonify({'error': f'Missing required field: {field}'}), 400
+    missing = _source_validator(data)
+    if missing:
+        return ojsonify({'error': f'Missing required field: {missing}'}, 400)
     
     project_id = data['project_id']
     source_url = data['source_url']
     
-    # Log auth info for Chrome extension
-    log_auth_info(project_id)
-    
-    # Validate project belongs to user
-    project = ProjectModel.get_project(project_id)
-    if not project or project.get('user_id') != user_id:
-        return jsonify({'error': 'Project not found or access denied'}), 404
+    # Validate project belongs to user (cached per project/user)
+    if not project_belongs_to(project_id, user_id):
+        return ojsonify({'error': 'Project not found or access denied'}, 404)
     
     # Unarchive highlight
     success = HighlightModel.unarchive_highlight(
@@ -714,19 +924,15 @@ def unarchive_highlight():
     )
     
     if success:
-        # Invalidate cache
-        redis_service = get_redis_service()
-        redis_service.delete(f"cache:highlights:{user_id}:{project_id}")
-        redis_service.delete(f"cache:highlights:{user_id}:{project_id}:{source_url}")
-        logger.debug(f"[REDIS] Invalidating cache: cache:highlights:{user_id}:{project_id}")
-        logger.debug(f"[REDIS] Cache invalidated successfully")
+        # Invalidate the list, per-source, limit-variant and search caches
+        invalidate_highlight_caches(user_id, project_id)
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'message': 'Highlight unarchived successfully'
-        }), 200
+        }, 200)
     else:
-        return jsonify({'error': 'Highlight not found'}), 404
+        return ojsonify({'error': 'Highlight not found'}, 404)
 
 
 @highlight_bp.route('/source', methods=['DELETE'])
@@ -744,28 +950,23 @@ def delete_source():
     """
     user_id = get_user_id_from_token()
     if not user_id:
-        return jsonify({'error': 'Unauthorized'}), 401
+        return ojsonify({'error': 'Unauthorized'}, 401)
     
-    data = request.get_json()
+    data = _load_json()
     if not data:
-        return jsonify({'error': 'No data provided'}), 400
+        return ojsonify({'error': 'No data provided'}, 400)
     
     # Validate required fields
-    required_fields = ['project_id', 'source_url']
-    for field in required_fields:
-        if not data.get(field):
-            return jsonify({'error': f'Missing required field: {field}'}), 400
+    missing = _source_validator(data)
+    if missing:
+        return ojsonify({'error': f'Missing required field: {missing}'}, 400)
     
     project_id = data['project_id']
     source_url = data['source_url']
     
-    # Log auth info for Chrome extension
-    log_auth_info(project_id)
-    
-    # Validate project belongs to user
-    project = ProjectModel.get_project(project_id)
-    if not project or project.get('user_id') != user_id:
-        return jsonify({'error': 'Project not found or access denied'}), 404
+    # Validate project belongs to user (cached per project/user)
+    if not project_belongs_to(project_id, user_id):
+        return ojsonify({'error': 'Project not found or access denied'}, 404)
     
     # Delete source and all highlights
     success = HighlightModel.delete_source(
@@ -775,19 +976,15 @@ def delete_source():
     )
     
     if success:
-        # Invalidate cache
-        redis_service = get_redis_service()
-        redis_service.delete(f"cache:highlights:{user_id}:{project_id}")
-        redis_service.delete(f"cache:highlights:{user_id}:{project_id}:{source_url}")
-        logger.debug(f"[REDIS] Invalidating cache: cache:highlights:{user_id}:{project_id}")
-        logger.debug(f"[REDIS] Cache invalidated successfully")
+        # Invalidate the list, per-source, limit-variant and search caches
+        invalidate_highlight_caches(user_id, project_id)
         
-        return jsonify({
+        return ojsonify({
             'success': True,
             'message': 'Source and all highlights deleted successfully'
-        }), 200
+        }, 200)
     else:
-        return jsonify({'error': 'Source not found'}), 404
+        return ojsonify({'error': 'Source not found'}, 404)
 
 
 @highlight_bp.route('/preview/<highlight_id>', methods=['GET'])
@@ -802,52 +999,40 @@ def get_highlight_preview(highlight_id):
     
     Returns: { preview_image_url: string } or { error: 'No preview available' }
     """
-    logger.debug(f"[PREVIEW] Fetching preview for highlight_id: {highlight_id}")
+    logger.debug("[PREVIEW] Fetching preview for highlight_id: %s", highlight_id)
     
     user_id = get_user_id_from_token()
     if not user_id:
-        logger.debug(f"[PREVIEW] ERROR: Unauthorized - no user_id from token")
-        return jsonify({'error': 'Unauthorized'}), 401
+        logger.debug("[PREVIEW] ERROR: Unauthorized - no user_id from token")
+        return ojsonify({'error': 'Unauthorized'}, 401)
     
-    logger.debug(f"[PREVIEW] User ID: {user_id}")
+    logger.debug("[PREVIEW] User ID: %s", user_id)
     
     project_id = request.args.get('project_id')
     source_url = request.args.get('source_url')
     
-    logger.debug(f"[PREVIEW] Project ID: {project_id}, Source URL: {source_url}")
+    logger.debug("[PREVIEW] Project ID: %s, Source URL: %s", project_id, source_url)
     
     if not project_id or not source_url:
-        logger.debug(f"[PREVIEW] ERROR: Missing required params - project_id: {project_id}, source_url: {source_url}")
-        return jsonify({'error': 'project_id and source_url required'}), 400
+        logger.debug("[PREVIEW] ERROR: Missing required params - project_id: %s, source_url: %s", project_id, source_url)
+        return ojsonify({'error': 'project_id and source_url required'}, 400)
     
     # Validate project belongs to user
-    project = ProjectModel.get_project(project_id)
-    if not project or project.get('user_id') != user_id:
-        logger.debug(f"[PREVIEW] ERROR: Project not found or access denied - project exists: {project is not None}")
-        return jsonify({'error': 'Project not found or access denied'}), 404
-    
-    # Get highlights for this URL
-    highlight_doc = HighlightModel.get_highlights_by_url(user_id, project_id, source_url)
-    if not highlight_doc:
-        logger.debug(f"[PREVIEW] ERROR: No highlight document found for URL: {source_url}")
-        return jsonify({'error': 'Not found'}), 404
-    
-    logger.debug(f"[PREVIEW] Found highlight doc with {len(highlight_doc.get('highlights', []))} highlights")
-    
-    # Find the specific highlight
-    for h in highlight_doc.get('highlights', []):
-        logger.debug(f"[PREVIEW] Checking highlight: {h.get('highlight_id')} - has preview_image_url: {h.get('preview_image_url') is not None}")
-        if h.get('highlight_id') == highlight_id:
-            # Only return S3 URL - no fallback to base64
-            preview_url = h.get('preview_image_url')
-            if preview_url:
-                # Fix URL region if needed
-                preview_url = S3Service.fix_s3_url_region(preview_url)
-                logger.debug(f"[PREVIEW] SUCCESS: Found preview URL: {preview_url}")
-                return jsonify({'preview_image_url': preview_url})
-            
-            logger.debug(f"[PREVIEW] ERROR: Highlight found but no preview_image_url field. Keys in highlight: {list(h.keys())}")
-            return jsonify({'error': 'No preview available', 'reason': 'preview_image_url field is missing or empty'}), 404
-    
-    logger.debug(f"[PREVIEW] ERROR: Highlight ID {highlight_id} not found in document")
-    return jsonify({'error': 'Highlight not found'}), 404
+    if not project_belongs_to(project_id, user_id):
+        logger.debug("[PREVIEW] ERROR: Project not found or access denied")
+        return ojsonify({'error': 'Project not found or access denied'}, 404)
+    
+    # Fetch only the requested highlight
+    h = HighlightModel.get_single_highlight(user_id, project_id, source_url, highlight_id)
+    if not h:
+        logger.debug("[PREVIEW] ERROR: Highlight ID %s not found for URL: %s", highlight_id, source_url)
+        return ojsonify({'error': 'Highlight not found'}, 404)
+    
+    # Only return S3 URL - no fallback to base64
+    preview_url = h.get('preview_image_url')
+    if preview_url:
+        logger.debug("[PREVIEW] SUCCESS: Found preview URL: %s", preview_url)
+        return ojsonify({'preview_image_url': preview_url})
+    
+    logger.debug("[PREVIEW] ERROR: Highlight found but no preview_image_url field. Keys in highlight: %s", list(h.keys()))
+    return ojsonify({'error': 'No preview available', 'reason': 'preview_image_url field is missing or empty'}, 404)
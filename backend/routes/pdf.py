@@ -3,8 +3,10 @@ Highlight Document Routes for handling PDF/Image uploads, viewing, and highlight
 Supports PDF, JPG, and PNG files.
 """
 from flask import Blueprint, request, jsonify, send_file, Response, stream_with_context
-from models.database import PDFDocumentModel, ProjectModel, HighlightModel
+from models.database import PDFDocumentModel, HighlightModel, PDF_METADATA_PROJECTION
 from utils.auth import get_user_id_from_token
+from utils.project_cache import project_belongs_to
+from utils.highlight_cache import invalidate_highlight_caches
 from utils.rate_limiter import get_limiter
 from services.pdf_extraction_service import get_highlight_extraction_service
 from services.vector_service import VectorService
@@ -14,11 +16,19 @@ from services.s3_service import S3Service
 from services.sse_service import SSEService
 from config import Config
 from utils.logger import get_logger, log_error
-import base64
-import io
-import threading
+from utils.json_response import ojsonify, json_bytes_response, dumps as json_dumps
 import queue
+import uuid
 import json
+import orjson
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
+
+# Optional: SIMD base64 codec for whole-file encode/decode (same API as the stdlib module)
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
 
 logger = get_logger(__name__)
 pdf_bp = Blueprint('pdf', __name__)
@@ -26,6 +36,15 @@ pdf_bp = Blueprint('pdf', __name__)
 # Get rate limiter instance
 limiter = get_limiter()
 
+# Bounded pool for highlight extraction, so upload bursts queue up instead of each
+# starting its own thread (and OpenAI call) at once
+_extraction_executor = ThreadPoolExecutor(
+    max_workers=Config.EXTRACTION_CONCURRENCY, thread_name_prefix='pdf-extraction'
+)
+
+# Naive datetimes go out as plain isoformat() (no 'Z'), as this API has always returned them
+_PDF_JSON_OPTIONS = 0
+
 # Supported file extensions and their MIME types
 SUPPORTED_EXTENSIONS = {
     '.pdf': 'application/pdf',
@@ -35,7 +54,113 @@ SUPPORTED_EXTENSIONS = {
 }
 
 
-def extract_highlights_async(doc_id, file_base64_data=None, content_type='application/pdf', file_url=None):
+def _fix_preview_urls(highlights):
+    """Rewrite highlight preview_image_url values to the configured S3 region, in place."""
+    for h in highlights:
+        if h.get('preview_image_url'):
+            h['preview_image_url'] = S3Service.fix_s3_url_region(h['preview_image_url'], is_pdf_highlight=True)
+    return highlights
+
+
+def _pdf_highlights_cache_key(user_id, pdf_id):
+    return f"cache:pdf_highlights:{user_id}:{pdf_id}"
+
+
+def _invalidate_pdf_lists(user_id, project_id=None, pdf_id=None):
+    """
+    Drop the cached PDF lists (project-scoped and 'all') in a single Redis roundtrip,
+    along with the PDF's cached highlights/status when pdf_id is given.
+    """
+    keys = [f"cache:pdfs:{user_id}:all"]
+    if project_id:
+        keys.append(f"cache:pdfs:{user_id}:{project_id}")
+    if pdf_id:
+        keys.append(_pdf_highlights_cache_key(user_id, pdf_id))
+    get_redis_service().delete_many(*keys)
+    logger.debug("[REDIS] Invalidated cache: %s", keys)
+
+
+def _invalidate_pdf_highlights(user_id, project_id, pdf_id):
+    """
+    Drop the PDF's cached highlights, plus the project's highlight list/search caches and
+    ETag token (PDF highlights live in the same highlights collection).
+    """
+    get_redis_service().delete(_pdf_highlights_cache_key(user_id, pdf_id))
+    invalidate_highlight_caches(user_id, project_id)
+
+
+def _supported_extension(filename):
+    """Return the supported extension filename ends with (e.g. '.pdf'), or None."""
+    # rpartition rather than os.path.splitext so a bare '.pdf' still counts, as with endswith
+    _, dot, ext = filename.lower().rpartition('.')
+    ext = dot + ext
+    return ext if ext in SUPPORTED_EXTENSIONS else None
+
+
+def _store_document_file(user_id, doc_id, filename, content_type, file_bytes):
+    """
+    Upload an uploaded document's bytes to S3, or to GridFS when S3 is unavailable.
+    
+    Returns:
+        (file_url, file_id): the S3 URL, or the GridFS file id when S3 is unavailable
+        or the upload failed (the other one is None)
+    """
+    if S3Service.is_available():
+        file_url = S3Service.upload_document_file(
+            file_bytes=file_bytes,
+            user_id=user_id,
+            pdf_id=doc_id,
+            filename=filename,
+            content_type=content_type
+        )
+        if file_url:
+            logger.debug("[PDF UPLOAD] Successfully uploaded to S3: %s", file_url)
+            return file_url, None
+        logger.debug("[PDF UPLOAD] S3 upload failed, will store in GridFS")
+    else:
+        logger.debug("[PDF UPLOAD] S3 not configured, storing in GridFS")
+    # Fallback to MongoDB, stored as raw binary (no base64)
+    return None, PDFDocumentModel.store_file(file_bytes, filename, content_type)
+
+
+def _iter_base64_decoded(data, chunk_size=64 * 1024):
+    """Decode a base64 string in chunk_size pieces (whole 4-character groups at a time)"""
+    step = chunk_size // 3 * 4
+    for start in range(0, len(data), step):
+        yield base64.b64decode(data[start:start + step])
+
+
+def _queue_extraction(doc_id, content_type, file_url, file_bytes=None):
+    """
+    Queue highlight extraction for a freshly uploaded document.
+    
+    For a single upload, hands the worker the bytes we already hold so it doesn't re-download
+    the file from S3/GridFS; it base64-encodes them off the request thread. Without file_bytes
+    the worker loads the file by reference (file_url, or the document's GridFS file_id).
+    """
+    _extraction_executor.submit(
+        extract_highlights_async, doc_id, None, content_type, file_url, file_bytes=file_bytes
+    )
+
+
+def _discard_stored_uploads(user_id, uploads):
+    """Best-effort cleanup of files (and any inserted entries) from a failed bulk upload."""
+    try:
+        PDFDocumentModel.delete_pdf_documents(user_id, [upload['pdf_id'] for upload in uploads])
+    except Exception as e:
+        logger.warning("[PDF UPLOAD] Failed to remove documents of a failed bulk upload: %s", e)
+    for upload in uploads:
+        try:
+            if upload['file_url']:
+                S3Service.delete_document_file_by_url(upload['file_url'])
+            elif upload['file_id']:
+                PDFDocumentModel.delete_file(upload['file_id'])
+        except Exception as e:
+            logger.warning("[PDF UPLOAD] Failed to remove stored file for %s: %s", upload['pdf_id'], e)
+
+
+def extract_highlights_async(doc_id, file_base64_data=None, content_type='application/pdf', file_url=None,
+                             file_bytes=None):
     """
     Extract highlights from document in background thread using OpenAI GPT-4o mini.
     Updates the document with extracted highlights.
@@ -45,6 +170,7 @@ def extract_highlights_async(doc_id, file_base64_data=None, content_type='applic
         file_base64_data: Base64 encoded file data (legacy - for old documents)
         content_type: MIME type
         file_url: S3 URL of the file (preferred for new uploads)
+        file_bytes: Raw file bytes, when the caller already has them (skips the S3 fetch)
     """
     try:
         # Get PDF document to retrieve user_id
@@ -62,6 +188,7 @@ def extract_highlights_async(doc_id, file_base64_data=None, content_type='applic
         
         # Update status to processing
         PDFDocumentModel.update_extraction_status(doc_id, 'processing')
+        _invalidate_pdf_lists(user_id, pdf_doc.get('project_id'), doc_id)
         
         # Send SSE event to notify frontend that extraction started
         try:
@@ -73,32 +200,43 @@ def extract_highlights_async(doc_id, file_base64_data=None, content_type='applic
                     'status': 'processing'
                 }
             )
-            logger.debug(f"[SSE] Sent extraction_started event for PDF {doc_id}")
+            logger.debug("[SSE] Sent extraction_started event for PDF %s", doc_id)
         except Exception as sse_error:
-            logger.debug(f"[SSE] Failed to send extraction_started event: {sse_error}")
+            logger.debug("[SSE] Failed to send extraction_started event: %s", sse_error)
         
-        # Get file data - prefer S3 URL, fallback to legacy file_data
-        if file_url:
+        # Get file data - prefer bytes already in hand, then S3 URL, then GridFS,
+        # fallback to legacy file_data
+        if file_bytes is None and not file_url and pdf_doc.get('file_id'):
+            grid_out = PDFDocumentModel.open_file(pdf_doc['file_id'])
+            if grid_out is not None:
+                file_bytes = grid_out.read()
+                logger.debug("[EXTRACTION] Read file from GridFS (%s bytes)", len(file_bytes))
+        
+        if file_bytes is not None:
+            # Convert to base64 for extraction service (it expects base64)
+            file_base64_data = base64.b64encode(file_bytes).decode('utf-8')
+        elif file_url:
             # Fetch from S3
-            logger.debug(f"[EXTRACTION] Fetching file from S3: {file_url}")
+            logger.debug("[EXTRACTION] Fetching file from S3: %s", file_url)
             file_bytes = S3Service.get_file_from_s3(file_url)
             if file_bytes:
                 # Convert to base64 for extraction service (it expects base64)
                 file_base64_data = base64.b64encode(file_bytes).decode('utf-8')
-                logger.debug(f"[EXTRACTION] Successfully fetched file from S3 ({len(file_bytes)} bytes)")
+                logger.debug("[EXTRACTION] Successfully fetched file from S3 (%s bytes)", len(file_bytes))
             else:
-                logger.debug(f"[EXTRACTION] Failed to fetch file from S3")
+                logger.debug("[EXTRACTION] Failed to fetch file from S3")
                 PDFDocumentModel.update_extraction_status(doc_id, 'failed', 'Failed to fetch file from S3')
+                _invalidate_pdf_lists(user_id, pdf_doc.get('project_id'), doc_id)
                 return
         elif not file_base64_data:
-            # Try to get from legacy file_data
-            file_doc = PDFDocumentModel.get_pdf_file_data(doc_id)
-            if file_doc and file_doc.get('file_data'):
-                file_base64_data = file_doc['file_data']
-                logger.debug(f"[EXTRACTION] Using legacy file_data from MongoDB")
+            # Try to get from legacy file_data (already loaded with the document above)
+            if pdf_doc.get('file_data'):
+                file_base64_data = pdf_doc['file_data']
+                logger.debug("[EXTRACTION] Using legacy file_data from MongoDB")
             else:
-                logger.debug(f"[EXTRACTION] No file data available")
+                logger.debug("[EXTRACTION] No file data available")
                 PDFDocumentModel.update_extraction_status(doc_id, 'failed', 'No file data available')
+                _invalidate_pdf_lists(user_id, pdf_doc.get('project_id'), doc_id)
                 return
         
         # Get highlight extraction service (uses OpenAI GPT-4o mini) and extract highlights
@@ -109,12 +247,12 @@ def extract_highlights_async(doc_id, file_base64_data=None, content_type='applic
         update_success = PDFDocumentModel.update_highlights(doc_id, highlights)
         
         if not update_success:
-            logger.debug(f"[ERROR] Failed to update highlights in database for PDF {doc_id}")
+            logger.debug("[ERROR] Failed to update highlights in database for PDF %s", doc_id)
             PDFDocumentModel.update_extraction_status(doc_id, 'failed', 'Failed to save highlights to database')
             raise Exception("Failed to update highlights in database")
         
-        logger.debug(f"Extracted {len(highlights)} highlights from document {doc_id}")
-        logger.debug(f"[EXTRACTION] Continuing to verification and cache invalidation for PDF {doc_id}, user_id: {user_id}")
+        logger.debug("Extracted %s highlights from document %s", len(highlights), doc_id)
+        logger.debug("[EXTRACTION] Continuing to verification and cache invalidation for PDF %s, user_id: %s", doc_id, user_id)
         
         # Index highlights for semantic search (Phase I)
         project_id = pdf_doc.get('project_id')
@@ -143,7 +281,7 @@ def extract_highlights_async(doc_id, file_base64_data=None, content_type='applic
                                 project_id=project_id,
                                 source_url=file_url
                             )
-                    logger.debug(f"[VECTORIZATION] Successfully indexed {len(highlight_doc.get('highlights', []))} highlights for PDF {doc_id}")
+                    logger.debug("[VECTORIZATION] Successfully indexed %s highlights for PDF %s", len(highlight_doc.get('highlights', [])), doc_id)
         except Exception as vec_error:
             logger.error(f"[VECTORIZATION] Error indexing highlights: {vec_error}")
             import traceback
@@ -157,7 +295,7 @@ def extract_highlights_async(doc_id, file_base64_data=None, content_type='applic
         if content_type == 'application/pdf':
             # Extract and index full PDF text
             try:
-                logger.debug(f"[VECTORIZATION] Extracting full text from PDF {doc_id}")
+                logger.debug("[VECTORIZATION] Extracting full text from PDF %s", doc_id)
                 full_text = extraction_service.extract_full_text(file_base64_data, content_type)
                 if full_text:
                     vector_service.index_pdf_full_text(
@@ -166,9 +304,9 @@ def extract_highlights_async(doc_id, file_base64_data=None, content_type='applic
                         user_id=user_id,
                         project_id=project_id
                     )
-                    logger.debug(f"[VECTORIZATION] Successfully indexed full PDF text for {doc_id}")
+                    logger.debug("[VECTORIZATION] Successfully indexed full PDF text for %s", doc_id)
                 else:
-                    logger.debug(f"[VECTORIZATION] No text extracted from PDF {doc_id}")
+                    logger.debug("[VECTORIZATION] No text extracted from PDF %s", doc_id)
             except Exception as vec_error:
                 logger.error(f"[VECTORIZATION] Error indexing PDF full text: {vec_error}")
                 import traceback
@@ -177,7 +315,7 @@ def extract_highlights_async(doc_id, file_base64_data=None, content_type='applic
         elif content_type in ['image/jpeg', 'image/jpg', 'image/png']:
             # Extract and index OCR text from image
             try:
-                logger.debug(f"[VECTORIZATION] Extracting OCR text from image {doc_id}")
+                logger.debug("[VECTORIZATION] Extracting OCR text from image %s", doc_id)
                 ocr_service = get_ocr_position_service()
                 if ocr_service and ocr_service.available:
                     ocr_text = ocr_service.extract_full_text(file_base64_data)
@@ -188,11 +326,11 @@ def extract_highlights_async(doc_id, file_base64_data=None, content_type='applic
                             user_id=user_id,
                             project_id=project_id
                         )
-                        logger.debug(f"[VECTORIZATION] Successfully indexed OCR text for image {doc_id}")
+                        logger.debug("[VECTORIZATION] Successfully indexed OCR text for image %s", doc_id)
                     else:
-                        logger.debug(f"[VECTORIZATION] No OCR text extracted from image {doc_id}")
+                        logger.debug("[VECTORIZATION] No OCR text extracted from image %s", doc_id)
                 else:
-                    logger.debug(f"[VECTORIZATION] OCR service not available for image {doc_id}")
+                    logger.debug("[VECTORIZATION] OCR service not available for image %s", doc_id)
             except Exception as vec_error:
                 logger.error(f"[VECTORIZATION] Error indexing image OCR text: {vec_error}")
                 import traceback
@@ -212,26 +350,24 @@ def extract_highlights_async(doc_id, file_base64_data=None, content_type='applic
                     highlight_doc = HighlightModel.get_highlights_by_url(user_id, project_id, file_url)
                     if highlight_doc:
                         actual_highlight_count = len(highlight_doc.get('highlights', []))
-                logger.debug(f"[VERIFY] PDF {doc_id} status in DB: {actual_status}, highlights: {actual_highlight_count}")
+                logger.debug("[VERIFY] PDF %s status in DB: %s, highlights: %s", doc_id, actual_status, actual_highlight_count)
                 if actual_status != 'completed':
-                    logger.debug(f"[ERROR] Extraction status is {actual_status}, expected 'completed'")
+                    logger.debug("[ERROR] Extraction status is %s, expected 'completed'", actual_status)
             else:
-                logger.debug(f"[ERROR] Could not verify update - PDF {doc_id} not found in database")
+                logger.debug("[ERROR] Could not verify update - PDF %s not found in database", doc_id)
         except Exception as verify_error:
-            logger.debug(f"[ERROR] Exception during verification: {verify_error}")
+            logger.debug("[ERROR] Exception during verification: %s", verify_error)
             import traceback
             traceback.print_exc()
         
         # Invalidate cache AFTER confirming DB update succeeded
         try:
             project_id = pdf_doc.get('project_id')
-            redis_service = get_redis_service()
-            if project_id:
-                redis_service.delete(f"cache:pdfs:{user_id}:{project_id}")
-            redis_service.delete(f"cache:pdfs:{user_id}:all")
-            logger.debug(f"[REDIS] Cache invalidated after extraction completion for PDF {doc_id}")
+            _invalidate_pdf_lists(user_id, project_id, doc_id)
+            invalidate_highlight_caches(user_id, project_id)
+            logger.debug("[REDIS] Cache invalidated after extraction completion for PDF %s", doc_id)
         except Exception as cache_error:
-            logger.debug(f"[ERROR] Exception during cache invalidation: {cache_error}")
+            logger.debug("[ERROR] Exception during cache invalidation: %s", cache_error)
             import traceback
             traceback.print_exc()
         
@@ -252,16 +388,16 @@ def extract_highlights_async(doc_id, file_base64_data=None, content_type='applic
                     'status': 'completed'
                 }
             )
-            logger.debug(f"[SSE] Sent extraction_complete event for PDF {doc_id}")
+            logger.debug("[SSE] Sent extraction_complete event for PDF %s", doc_id)
         except Exception as sse_error:
-            logger.debug(f"[ERROR] Exception during SSE broadcast: {sse_error}")
+            logger.debug("[ERROR] Exception during SSE broadcast: %s", sse_error)
             import traceback
             traceback.print_exc()
         
     except Exception as e:
         error_msg = str(e)
         import traceback
-        logger.debug(f"[ERROR] Error extracting highlights from document {doc_id}: {error_msg}")
+        logger.debug("[ERROR] Error extracting highlights from document %s: %s", doc_id, error_msg)
         traceback.print_exc()
         PDFDocumentModel.update_extraction_status(doc_id, 'failed', error_msg)
         
@@ -274,6 +410,10 @@ def extract_highlights_async(doc_id, file_base64_data=None, content_type='applic
                     user_id = pdf_doc.get('user_id')
             
             if user_id:
+                _invalidate_pdf_lists(user_id, pdf_doc.get('project_id') if pdf_doc else None, doc_id)
+                if pdf_doc:
+                    # Highlights saved before the failure are already visible in the lists
+                    invalidate_highlight_caches(user_id, pdf_doc.get('project_id'))
                 SSEService.broadcast_to_user(
                     user_id=user_id,
                     event_type='extraction_failed',
@@ -283,11 +423,11 @@ def extract_highlights_async(doc_id, file_base64_data=None, content_type='applic
                         'status': 'failed'
                     }
                 )
-                logger.debug(f"[SSE] Sent extraction_failed event for PDF {doc_id}")
+                logger.debug("[SSE] Sent extraction_failed event for PDF %s", doc_id)
             else:
-                logger.debug(f"[SSE] Cannot send extraction_failed event - user_id not available")
+                logger.debug("[SSE] Cannot send extraction_failed event - user_id not available")
         except Exception as sse_error:
-            logger.debug(f"[SSE] Failed to send extraction_failed event: {sse_error}")
+            logger.debug("[SSE] Failed to send extraction_failed event: %s", sse_error)
             import traceback
             traceback.print_exc()
 
@@ -329,13 +469,7 @@ def upload_document():
             return jsonify({'error': 'project_id is required'}), 400
         
         # Check file type
-        filename_lower = file.filename.lower()
-        file_ext = None
-        for ext in SUPPORTED_EXTENSIONS:
-            if filename_lower.endswith(ext):
-                file_ext = ext
-                break
-        
+        file_ext = _supported_extension(file.filename)
         if not file_ext:
             return jsonify({'error': 'Only PDF, JPG, and PNG files are allowed'}), 400
         
@@ -362,34 +496,12 @@ def upload_document():
         file_bytes = base64.b64decode(file_data_base64)
     
     # Validate project belongs to user
-    project = ProjectModel.get_project(project_id)
-    if not project or project.get('user_id') != user_id:
+    if not project_belongs_to(project_id, user_id):
         return jsonify({'error': 'Project not found or access denied'}), 404
     
-    # Generate PDF ID upfront (needed for S3 key)
-    import uuid
+    # Generate PDF ID upfront (needed for S3 key) and upload file to S3
     doc_id = str(uuid.uuid4())
-    
-    # Upload file to S3
-    file_url = None
-    if S3Service.is_available():
-        file_url = S3Service.upload_document_file(
-            file_bytes=file_bytes,
-            user_id=user_id,
-            pdf_id=doc_id,
-            filename=filename,
-            content_type=content_type
-        )
-        if file_url:
-            logger.debug(f"[PDF UPLOAD] Successfully uploaded to S3: {file_url}")
-        else:
-            logger.debug(f"[PDF UPLOAD] S3 upload failed, will store in MongoDB (legacy mode)")
-            # Fallback to base64 for legacy support
-            file_data = base64.b64encode(file_bytes).decode('utf-8')
-    else:
-        logger.debug(f"[PDF UPLOAD] S3 not configured, storing in MongoDB (legacy mode)")
-        # Fallback to base64 for legacy support
-        file_data = base64.b64encode(file_bytes).decode('utf-8')
+    file_url, file_id = _store_document_file(user_id, doc_id, filename, content_type, file_bytes)
     
     # Create document entry
     PDFDocumentModel.create_pdf_document(
@@ -397,29 +509,15 @@ def upload_document():
         project_id=project_id,
         filename=filename,
         file_url=file_url,
-        file_data=file_data if not file_url else None,  # Only store base64 if S3 upload failed
+        file_id=file_id,  # Only set if S3 upload failed
         content_type=content_type,
         pdf_id=doc_id  # Use the pre-generated ID
     )
     
     # Invalidate cache
-    redis_service = get_redis_service()
-    if project_id:
-        redis_service.delete(f"cache:pdfs:{user_id}:{project_id}")
-    redis_service.delete(f"cache:pdfs:{user_id}:all")
-    logger.debug(f"[REDIS] Invalidating cache: cache:pdfs:{user_id}:{project_id or 'all'}")
-    logger.debug(f"[REDIS] Cache invalidated successfully")
-    
-    # Prepare file data for extraction (needed for extraction service)
-    file_base64_for_extraction = base64.b64encode(file_bytes).decode('utf-8')
-    
-    # Start background thread to extract highlights
-    thread = threading.Thread(
-        target=extract_highlights_async,
-        args=(doc_id, file_base64_for_extraction, content_type, file_url)
-    )
-    thread.daemon = True
-    thread.start()
+    _invalidate_pdf_lists(user_id, project_id)
+    
+    _queue_extraction(doc_id, content_type, file_url, file_bytes)
     
     return jsonify({
         'success': True,
@@ -428,6 +526,80 @@ def upload_document():
     }), 201
 
 
+@pdf_bp.route('/bulk', methods=['POST'])
+@limiter.limit("5 per minute") if limiter else lambda f: f
+def upload_documents_bulk():
+    """
+    Upload several highlight documents (PDF, JPG, or PNG) to one project at once.
+    Creates all document entries in one insert and invalidates the cached lists once.
+    
+    Body (multipart/form-data):
+        files: PDF/JPG/PNG files (required, repeated field, up to Config.MAX_BULK_UPLOAD_FILES)
+        project_id: string (required)
+    
+    Returns: { success: true, pdf_ids: [string], message: string }
+    """
+    user_id = get_user_id_from_token()
+    if not user_id:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    files = request.files.getlist('files')
+    project_id = request.form.get('project_id')
+    
+    if not files:
+        return jsonify({'error': 'No files provided'}), 400
+    
+    if len(files) > Config.MAX_BULK_UPLOAD_FILES:
+        return jsonify({'error': f'At most {Config.MAX_BULK_UPLOAD_FILES} files per upload'}), 400
+    
+    if not project_id:
+        return jsonify({'error': 'project_id is required'}), 400
+    
+    # Check every file type before storing anything
+    file_exts = [_supported_extension(file.filename or '') for file in files]
+    for file, file_ext in zip(files, file_exts):
+        if not file_ext:
+            return jsonify({'error': f'Only PDF, JPG, and PNG files are allowed: {file.filename or "(no name)"}'}), 400
+    
+    # Validate project belongs to user
+    if not project_belongs_to(project_id, user_id):
+        return jsonify({'error': 'Project not found or access denied'}), 404
+    
+    # Store each file as it is read (only one upload's bytes are held at a time), then create
+    # all document entries in one round trip. On any failure, remove what was already stored
+    uploads = []
+    try:
+        for file, file_ext in zip(files, file_exts):
+            doc_id = str(uuid.uuid4())
+            content_type = file.content_type or SUPPORTED_EXTENSIONS[file_ext]
+            file_url, file_id = _store_document_file(user_id, doc_id, file.filename, content_type, file.read())
+            uploads.append({
+                'pdf_id': doc_id,
+                'filename': file.filename,
+                'file_url': file_url,
+                'file_id': file_id,
+                'content_type': content_type
+            })
+        
+        pdf_ids = PDFDocumentModel.create_pdf_documents(user_id, project_id, uploads)
+    except Exception as e:
+        log_error(logger, e, "Bulk upload failed", stored_files=len(uploads))
+        _discard_stored_uploads(user_id, uploads)
+        return jsonify({'error': 'Failed to store uploaded files'}), 500
+    
+    _invalidate_pdf_lists(user_id, project_id)
+    
+    # Extraction loads each file by reference, so no upload stays in memory while queued
+    for upload in uploads:
+        _queue_extraction(upload['pdf_id'], upload['content_type'], upload['file_url'])
+    
+    return jsonify({
+        'success': True,
+        'pdf_ids': pdf_ids,
+        'message': f'{len(pdf_ids)} documents uploaded successfully. Highlight extraction in progress.'
+    }), 201
+
+
 @pdf_bp.route('', methods=['GET'])
 @limiter.limit("60 per minute") if limiter else lambda f: f
 def get_pdfs():
@@ -448,8 +620,8 @@ def get_pdfs():
     project_id = request.args.get('project_id')
     
     if pdf_id:
-        # Get specific PDF (don't cache individual PDFs due to size)
-        pdf = PDFDocumentModel.get_pdf_document(pdf_id)
+        # Get specific PDF (don't cache individual PDFs due to size; file_data is never returned)
+        pdf = PDFDocumentModel.get_pdf_document(pdf_id, PDF_METADATA_PROJECTION)
         if not pdf or pdf.get('user_id') != user_id:
             return jsonify({'error': 'PDF not found or access denied'}), 404
         
@@ -461,25 +633,9 @@ def get_pdfs():
             highlight_doc = HighlightModel.get_highlights_by_url(user_id, project_id, file_url)
             if highlight_doc:
                 highlights = highlight_doc.get('highlights', [])
-        pdf['highlights'] = highlights
+        pdf['highlights'] = _fix_preview_urls(highlights)
         
-        # Convert ObjectId and datetime
-        pdf['_id'] = str(pdf['_id'])
-        if 'created_at' in pdf:
-            pdf['created_at'] = pdf['created_at'].isoformat()
-        if 'updated_at' in pdf:
-            pdf['updated_at'] = pdf['updated_at'].isoformat()
-        for h in pdf.get('highlights', []):
-            if 'timestamp' in h:
-                h['timestamp'] = h['timestamp'].isoformat()
-            # Fix preview_image_url region if present
-            if 'preview_image_url' in h and h['preview_image_url']:
-                h['preview_image_url'] = S3Service.fix_s3_url_region(h['preview_image_url'], is_pdf_highlight=True)
-        
-        # Don't include file_data in response (too large)
-        pdf.pop('file_data', None)
-        
-        return jsonify({'pdf': pdf}), 200
+        return ojsonify({'pdf': pdf}, option=_PDF_JSON_OPTIONS)
     
     # Generate cache key for list endpoints
     if project_id:
@@ -487,46 +643,43 @@ def get_pdfs():
     else:
         cache_key = f"cache:pdfs:{user_id}:all"
     
-    # Check Redis cache first
+    # Check Redis cache first (stored as the serialized response body)
     redis_service = get_redis_service()
-    cached_data = redis_service.get(cache_key)
+    cached_body = redis_service.get_bytes(cache_key)
     
-    if cached_data is not None:
+    if cached_body is not None:
         # Verify cached data - check if any PDFs have stale 'processing' status
-        pdfs = cached_data.get('pdfs', [])
+        pdfs = orjson.loads(cached_body).get('pdfs', [])
         needs_refresh = False
         for pdf in pdfs:
             if pdf.get('extraction_status') == 'processing':
                 # Verify this PDF's actual status in DB
                 pdf_id = pdf.get('pdf_id')
                 if pdf_id:
-                    actual_doc = PDFDocumentModel.get_pdf_document(pdf_id)
+                    actual_doc = PDFDocumentModel.get_pdf_document(pdf_id, {'extraction_status': 1})
                     if actual_doc:
                         actual_status = actual_doc.get('extraction_status')
                         if actual_status != 'processing':
-                            logger.debug(f"[CACHE VERIFY] PDF {pdf_id} in cache has status=processing, but DB has status={actual_status}. Invalidating cache.")
+                            logger.debug("[CACHE VERIFY] PDF %s in cache has status=processing, but DB has status=%s. Invalidating cache.", pdf_id, actual_status)
                             needs_refresh = True
                             break
         
         if not needs_refresh:
-            logger.debug(f"[REDIS] get_pdfs: Cache hit (verified)")
-            return jsonify(cached_data), 200
+            logger.debug("[REDIS] get_pdfs: Cache hit (verified)")
+            return json_bytes_response(cached_body)
         else:
             # Invalidate cache and fetch fresh data
-            logger.debug(f"[REDIS] get_pdfs: Cache hit but stale, invalidating and fetching fresh")
-            redis_service.delete(cache_key)
-            if project_id:
-                redis_service.delete(f"cache:pdfs:{user_id}:all")
+            logger.debug("[REDIS] get_pdfs: Cache hit but stale, invalidating and fetching fresh")
+            _invalidate_pdf_lists(user_id, project_id)
             # Fall through to fetch from MongoDB
     
     # Cache miss - fetch from MongoDB
-            logger.debug(f"[REDIS] get_pdfs: Cache key: {cache_key}")
-            logger.debug(f"[REDIS] get_pdfs: Cache miss, fetching from MongoDB")
+            logger.debug("[REDIS] get_pdfs: Cache key: %s", cache_key)
+            logger.debug("[REDIS] get_pdfs: Cache miss, fetching from MongoDB")
     
     if project_id:
         # Validate project belongs to user
-        project = ProjectModel.get_project(project_id)
-        if not project or project.get('user_id') != user_id:
+        if not project_belongs_to(project_id, user_id):
             return jsonify({'error': 'Project not found or access denied'}), 404
         
         # Get all PDFs for project
@@ -535,43 +688,23 @@ def get_pdfs():
         # Get all PDFs for user
         pdfs = PDFDocumentModel.get_all_pdf_documents(user_id)
     
-    # Convert ObjectId and datetime, and fetch highlights from highlights collection
+    # Fetch highlights for every PDF in one query, using file_url as source_url
+    highlights_by_source = HighlightModel.get_highlights_by_urls(
+        user_id, {pdf['file_url'] for pdf in pdfs if pdf.get('file_url')}, project_id
+    )
     for pdf in pdfs:
-        pdf['_id'] = str(pdf['_id'])
-        if 'created_at' in pdf:
-            pdf['created_at'] = pdf['created_at'].isoformat()
-        if 'updated_at' in pdf:
-            pdf['updated_at'] = pdf['updated_at'].isoformat()
-        
-        # Get highlights from highlights collection using file_url as source_url
-        file_url = pdf.get('file_url')
-        project_id = pdf.get('project_id')
-        highlights = []
-        if file_url:
-            highlight_doc = HighlightModel.get_highlights_by_url(user_id, project_id, file_url)
-            if highlight_doc:
-                highlights = highlight_doc.get('highlights', [])
-        pdf['highlights'] = highlights
-        
-        # Ensure extraction_status is included and log it for debugging
-        extraction_status = pdf.get('extraction_status', 'unknown')
-        highlight_count = len(highlights)
-        logger.debug(f"[GET_PDFS] PDF {pdf.get('pdf_id', 'unknown')}: status={extraction_status}, highlights={highlight_count}")
-        
-        for h in highlights:
-            if 'timestamp' in h:
-                h['timestamp'] = h['timestamp'].isoformat()
-            # Fix preview_image_url region if present
-            if 'preview_image_url' in h and h['preview_image_url']:
-                h['preview_image_url'] = S3Service.fix_s3_url_region(h['preview_image_url'], is_pdf_highlight=True)
+        highlights = highlights_by_source.get((pdf.get('project_id'), pdf.get('file_url')), [])
+        pdf['highlights'] = _fix_preview_urls(highlights)
+        logger.debug("[GET_PDFS] PDF %s: status=%s, highlights=%s", pdf.get('pdf_id', 'unknown'), pdf.get('extraction_status', 'unknown'), len(highlights))
     
-    response_data = {'pdfs': pdfs}
+    # orjson serializes ObjectId (via str) and datetimes directly
+    body = json_dumps({'pdfs': pdfs}, _PDF_JSON_OPTIONS)
     
     # Cache the result
-    redis_service.set(cache_key, response_data, ttl=Config.REDIS_TTL_DOCUMENTS)
-    logger.debug(f"[REDIS] get_pdfs: Cached {len(pdfs)} PDFs")
+    redis_service.set_bytes(cache_key, body, ttl=Config.REDIS_TTL_DOCUMENTS)
+    logger.debug("[REDIS] get_pdfs: Cached %s PDFs", len(pdfs))
     
-    return jsonify(response_data), 200
+    return json_bytes_response(body)
 
 
 @pdf_bp.route('/file/<pdf_id>', methods=['GET'])
@@ -610,18 +743,13 @@ def get_pdf_file(pdf_id):
     if not user_id:
         return jsonify({'error': 'Unauthorized'}), 401
     
-    # Get PDF document to verify ownership
-    pdf = PDFDocumentModel.get_pdf_document(pdf_id)
-    if not pdf or pdf.get('user_id') != user_id:
+    # Get PDF metadata to verify ownership (legacy file_data is only loaded if it's needed)
+    pdf = PDFDocumentModel.get_pdf_document(pdf_id, PDF_METADATA_PROJECTION)
+    if pdf is None or pdf.get('user_id') != user_id:
         return jsonify({'error': 'PDF not found or access denied'}), 404
     
-    # Get file data/URL
-    file_doc = PDFDocumentModel.get_pdf_file_data(pdf_id)
-    if not file_doc:
-        return jsonify({'error': 'PDF file not found'}), 404
-    
     # Check for S3 URL first (new uploads)
-    file_url = file_doc.get('file_url')
+    file_url = pdf.get('file_url')
     if file_url:
         # Fix URL region if needed before redirecting
         file_url = S3Service.fix_s3_url_region(file_url, is_pdf_highlight=True)
@@ -629,15 +757,50 @@ def get_pdf_file(pdf_id):
         from flask import redirect
         return redirect(file_url, code=302)
     
+    content_type = pdf.get('content_type', 'application/pdf')
+    filename = pdf.get('filename', 'document.pdf')
+    
+    # Files stored in GridFS (S3 unavailable at upload) stream straight from MongoDB.
+    # Stored files never change, so the file id is a stable ETag (iframe reloads get a 304)
+    if pdf.get('file_id'):
+        grid_out = PDFDocumentModel.open_file(pdf['file_id'])
+        if grid_out is not None:
+            return send_file(
+                grid_out,
+                mimetype=content_type,
+                as_attachment=False,
+                download_name=filename,
+                conditional=True,
+                etag=str(pdf['file_id']),
+                last_modified=grid_out.upload_date
+            )
+    
     # Fallback to legacy file_data (base64)
-    if file_doc.get('file_data'):
-        pdf_bytes = base64.b64decode(file_doc['file_data'])
-        return send_file(
-            io.BytesIO(pdf_bytes),
-            mimetype=file_doc.get('content_type', 'application/pdf'),
-            as_attachment=False,
-            download_name=file_doc.get('filename', 'document.pdf')
-        )
+    file_data = (PDFDocumentModel.get_pdf_document(pdf_id, {'_id': 0, 'file_data': 1}) or {}).get('file_data')
+    if file_data:
+        # Move the legacy file to S3 on first view, so later views redirect instead of
+        # pushing the whole file through this worker
+        if S3Service.is_available():
+            pdf_bytes = base64.b64decode(file_data)
+            file_url = S3Service.upload_document_file(
+                file_bytes=pdf_bytes,
+                user_id=user_id,
+                pdf_id=pdf_id,
+                filename=filename,
+                content_type=content_type
+            )
+            if file_url and PDFDocumentModel.move_file_data_to_url(pdf_id, file_url):
+                logger.debug("[PDF FILE] Moved legacy file_data to S3: %s", file_url)
+                _invalidate_pdf_lists(user_id, pdf.get('project_id'))
+                from flask import redirect
+                return redirect(file_url, code=302)
+        
+        # Decode while streaming rather than holding a second, decoded copy of the file
+        response = Response(_iter_base64_decoded(file_data), mimetype=content_type)
+        response.content_length = len(file_data) * 3 // 4 - file_data[-2:].count('=')
+        response.headers['Content-Disposition'] = f"inline; filename*=UTF-8''{quote(filename)}"
+        response.set_etag(pdf_id)
+        return response.make_conditional(request)
     
     return jsonify({'error': 'PDF file data not found'}), 404
 
@@ -654,7 +817,17 @@ def get_pdf_highlights(pdf_id):
     if not user_id:
         return jsonify({'error': 'Unauthorized'}), 401
     
-    pdf = PDFDocumentModel.get_pdf_document(pdf_id)
+    # Polled while extraction runs, so serve from a short-lived cache (keyed by user, so a
+    # hit implies ownership); extraction and highlight mutations invalidate it
+    redis_service = get_redis_service()
+    cache_key = _pdf_highlights_cache_key(user_id, pdf_id)
+    cached_body = redis_service.get_bytes(cache_key)
+    if cached_body is not None:
+        return json_bytes_response(cached_body)
+    
+    pdf = PDFDocumentModel.get_pdf_document(
+        pdf_id, {'user_id': 1, 'project_id': 1, 'file_url': 1, 'extraction_status': 1, 'extraction_error': 1}
+    )
     if not pdf or pdf.get('user_id') != user_id:
         return jsonify({'error': 'PDF not found or access denied'}), 404
     
@@ -668,19 +841,14 @@ def get_pdf_highlights(pdf_id):
         if highlight_doc:
             highlights = highlight_doc.get('highlights', [])
     
-    # Format timestamps and fix preview URLs
-    for h in highlights:
-        if 'timestamp' in h:
-            h['timestamp'] = h['timestamp'].isoformat()
-        # Fix preview_image_url region if present
-        if 'preview_image_url' in h and h['preview_image_url']:
-            h['preview_image_url'] = S3Service.fix_s3_url_region(h['preview_image_url'], is_pdf_highlight=True)
-    
-    return jsonify({
-        'highlights': highlights,
+    body = json_dumps({
+        'highlights': _fix_preview_urls(highlights),
         'extraction_status': pdf.get('extraction_status', 'pending'),
         'extraction_error': pdf.get('extraction_error')
-    }), 200
+    }, _PDF_JSON_OPTIONS)
+    redis_service.set_bytes(cache_key, body, ttl=30)
+    
+    return json_bytes_response(body)
 
 
 @pdf_bp.route('/highlights/<pdf_id>', methods=['POST'])
@@ -706,7 +874,7 @@ def add_pdf_highlight(pdf_id):
     if not data or not data.get('text'):
         return jsonify({'error': 'text is required'}), 400
     
-    pdf = PDFDocumentModel.get_pdf_document(pdf_id)
+    pdf = PDFDocumentModel.get_pdf_document(pdf_id, PDF_METADATA_PROJECTION)
     if not pdf or pdf.get('user_id') != user_id:
         return jsonify({'error': 'PDF not found or access denied'}), 404
     
@@ -717,6 +885,7 @@ def add_pdf_highlight(pdf_id):
         page_number=data.get('page_number'),
         note=data.get('note')
     )
+    _invalidate_pdf_highlights(user_id, pdf.get('project_id'), pdf_id)
     
     return jsonify({
         'success': True,
@@ -736,13 +905,14 @@ def delete_pdf_highlight(pdf_id, highlight_id):
     if not user_id:
         return jsonify({'error': 'Unauthorized'}), 401
     
-    pdf = PDFDocumentModel.get_pdf_document(pdf_id)
+    pdf = PDFDocumentModel.get_pdf_document(pdf_id, PDF_METADATA_PROJECTION)
     if not pdf or pdf.get('user_id') != user_id:
         return jsonify({'error': 'PDF not found or access denied'}), 404
     
     success = PDFDocumentModel.delete_highlight(pdf_id, highlight_id)
     
     if success:
+        _invalidate_pdf_highlights(user_id, pdf.get('project_id'), pdf_id)
         return jsonify({
             'success': True,
             'message': 'Highlight deleted successfully'
@@ -771,7 +941,7 @@ def update_pdf_highlight(pdf_id, highlight_id):
     if not data:
         return jsonify({'error': 'No data provided'}), 400
     
-    pdf = PDFDocumentModel.get_pdf_document(pdf_id)
+    pdf = PDFDocumentModel.get_pdf_document(pdf_id, PDF_METADATA_PROJECTION)
     if not pdf or pdf.get('user_id') != user_id:
         return jsonify({'error': 'PDF not found or access denied'}), 404
     
@@ -779,6 +949,7 @@ def update_pdf_highlight(pdf_id, highlight_id):
     success = PDFDocumentModel.update_highlight_note(pdf_id, highlight_id, note)
     
     if success:
+        _invalidate_pdf_highlights(user_id, pdf.get('project_id'), pdf_id)
         return jsonify({
             'success': True,
             'message': 'Highlight updated successfully'
@@ -799,37 +970,31 @@ def delete_pdf(pdf_id):
     if not user_id:
         return jsonify({'error': 'Unauthorized'}), 401
     
-    # Get PDF to find project_id and file_url before deletion
-    pdf = PDFDocumentModel.get_pdf_document(pdf_id)
-    if not pdf or pdf.get('user_id') != user_id:
+    # Delete the user's PDF, getting back its project_id and file_url in the same round trip
+    pdf = PDFDocumentModel.delete_pdf_document(pdf_id, user_id)
+    if pdf is None:
         return jsonify({'error': 'PDF not found or access denied'}), 404
     
     project_id = pdf.get('project_id')
     file_url = pdf.get('file_url')
-    filename = pdf.get('filename', 'document.pdf')
     
     # Delete file from S3 if it exists
     if file_url:
         S3Service.delete_document_file_by_url(file_url)
-        logger.debug(f"[PDF DELETE] Deleted file from S3: {file_url}")
+        logger.debug("[PDF DELETE] Deleted file from S3: %s", file_url)
     
-    success = PDFDocumentModel.delete_pdf_document(pdf_id, user_id)
+    # Delete file from GridFS if it exists
+    if pdf.get('file_id'):
+        PDFDocumentModel.delete_file(pdf['file_id'])
+        logger.debug("[PDF DELETE] Deleted file from GridFS: %s", pdf['file_id'])
     
-    if success:
-        # Invalidate cache
-        redis_service = get_redis_service()
-        if project_id:
-            redis_service.delete(f"cache:pdfs:{user_id}:{project_id}")
-        redis_service.delete(f"cache:pdfs:{user_id}:all")
-        logger.debug(f"[REDIS] Invalidating cache: cache:pdfs:{user_id}:{project_id or 'all'}")
-        logger.debug(f"[REDIS] Cache invalidated successfully")
-        
-        return jsonify({
-            'success': True,
-            'message': 'PDF deleted successfully'
-        }), 200
-    else:
-        return jsonify({'error': 'PDF deletion failed'}), 500
+    # Invalidate cache
+    _invalidate_pdf_lists(user_id, project_id, pdf_id)
+    
+    return jsonify({
+        'success': True,
+        'message': 'PDF deleted successfully'
+    }), 200
 
 
 @pdf_bp.route('/reextract/<pdf_id>', methods=['POST'])
@@ -845,29 +1010,20 @@ def reextract_highlights(pdf_id):
     if not user_id:
         return jsonify({'error': 'Unauthorized'}), 401
     
-    pdf = PDFDocumentModel.get_pdf_document(pdf_id)
-    if not pdf or pdf.get('user_id') != user_id:
+    # Metadata only: the worker loads the file itself, so the request never pulls it
+    pdf = PDFDocumentModel.get_pdf_document(pdf_id, PDF_METADATA_PROJECTION)
+    if pdf is None or pdf.get('user_id') != user_id:
         return jsonify({'error': 'PDF not found or access denied'}), 404
     
-    # Get file data
-    file_doc = PDFDocumentModel.get_pdf_file_data(pdf_id)
-    if not file_doc:
-        return jsonify({'error': 'PDF file not found'}), 404
-    
-    # Get file data - prefer S3 URL, fallback to legacy file_data
-    file_url = file_doc.get('file_url')
-    file_data = file_doc.get('file_data')
-    
-    if not file_url and not file_data:
+    # Prefer S3 URL, then GridFS, fallback to legacy file_data; only pass the worker the reference
+    file_url = pdf.get('file_url')
+    if not file_url and not pdf.get('file_id') and not PDFDocumentModel.has_file_data(pdf_id):
         return jsonify({'error': 'PDF file data not found'}), 404
     
-    # Start background thread to re-extract highlights
-    thread = threading.Thread(
-        target=extract_highlights_async,
-        args=(pdf_id, file_data, file_doc.get('content_type', 'application/pdf'), file_url)
+    # Queue highlight re-extraction in the background
+    _extraction_executor.submit(
+        extract_highlights_async, pdf_id, None, pdf.get('content_type', 'application/pdf'), file_url
     )
-    thread.daemon = True
-    thread.start()
     
     return jsonify({
         'success': True,
@@ -900,32 +1056,19 @@ def archive_pdf():
     if not pdf_id:
         return jsonify({'error': 'pdf_id is required'}), 400
     
-    # Verify PDF belongs to user
-    pdf = PDFDocumentModel.get_pdf_document(pdf_id)
-    if not pdf or pdf.get('user_id') != user_id:
+    # Archive the user's PDF, getting back its project_id in the same round trip
+    pdf = PDFDocumentModel.archive_pdf_document(pdf_id, user_id)
+    if pdf is None:
         return jsonify({'error': 'PDF not found or access denied'}), 404
     
-    # Get project_id before archiving
+    # Invalidate cache
     project_id = pdf.get('project_id')
+    _invalidate_pdf_lists(user_id, project_id)
     
-    # Archive PDF
-    success = PDFDocumentModel.archive_pdf_document(pdf_id)
-    
-    if success:
-        # Invalidate cache
-        redis_service = get_redis_service()
-        if project_id:
-            redis_service.delete(f"cache:pdfs:{user_id}:{project_id}")
-        redis_service.delete(f"cache:pdfs:{user_id}:all")
-        logger.debug(f"[REDIS] Invalidating cache: cache:pdfs:{user_id}:{project_id or 'all'}")
-        logger.debug(f"[REDIS] Cache invalidated successfully")
-        
-        return jsonify({
-            'success': True,
-            'message': 'PDF archived successfully'
-        }), 200
-    else:
-        return jsonify({'error': 'Failed to archive PDF'}), 500
+    return jsonify({
+        'success': True,
+        'message': 'PDF archived successfully'
+    }), 200
 
 
 @pdf_bp.route('/unarchive', methods=['PUT'])
@@ -953,32 +1096,19 @@ def unarchive_pdf():
     if not pdf_id:
         return jsonify({'error': 'pdf_id is required'}), 400
     
-    # Verify PDF belongs to user
-    pdf = PDFDocumentModel.get_pdf_document(pdf_id)
-    if not pdf or pdf.get('user_id') != user_id:
+    # Unarchive the user's PDF, getting back its project_id in the same round trip
+    pdf = PDFDocumentModel.unarchive_pdf_document(pdf_id, user_id)
+    if pdf is None:
         return jsonify({'error': 'PDF not found or access denied'}), 404
     
-    # Get project_id before unarchiving
+    # Invalidate cache
     project_id = pdf.get('project_id')
+    _invalidate_pdf_lists(user_id, project_id)
     
-    # Unarchive PDF
-    success = PDFDocumentModel.unarchive_pdf_document(pdf_id)
-    
-    if success:
-        # Invalidate cache
-        redis_service = get_redis_service()
-        if project_id:
-            redis_service.delete(f"cache:pdfs:{user_id}:{project_id}")
-        redis_service.delete(f"cache:pdfs:{user_id}:all")
-        logger.debug(f"[REDIS] Invalidating cache: cache:pdfs:{user_id}:{project_id or 'all'}")
-        logger.debug(f"[REDIS] Cache invalidated successfully")
-        
-        return jsonify({
-            'success': True,
-            'message': 'PDF unarchived successfully'
-        }), 200
-    else:
-        return jsonify({'error': 'Failed to unarchive PDF'}), 500
+    return jsonify({
+        'success': True,
+        'message': 'PDF unarchived successfully'
+    }), 200
 
 
 @pdf_bp.route('/events', methods=['GET'])
@@ -1003,21 +1133,21 @@ def sse_events():
             status=401
         )
     
-    logger.debug(f"[SSE] New connection request from user {user_id}")
+    logger.debug("[SSE] New connection request from user %s", user_id)
     
     # Create a queue for this connection
     event_queue = queue.Queue()
     
     # Add connection to SSE service with type 'pdf'
     SSEService.add_connection(user_id, event_queue, connection_type='pdf')
-    logger.debug(f"[SSE] PDF connection added for user {user_id}, total connections: {SSEService.get_connection_count(user_id)}")
+    logger.debug("[SSE] PDF connection added for user %s, total connections: %s", user_id, SSEService.get_connection_count(user_id))
     
     def event_stream():
         """Generator function that yields SSE events."""
         try:
             # Send initial connection message
             yield f"data: {json.dumps({'type': 'connected', 'message': 'SSE connection established'})}\n\n"
-            logger.debug(f"[SSE] Sent connection confirmation to user {user_id}")
+            logger.debug("[SSE] Sent connection confirmation to user %s", user_id)
             
             while True:
                 try:
@@ -1027,26 +1157,26 @@ def sse_events():
                     # Format as SSE
                     event_json = json.dumps(event)
                     yield f"data: {event_json}\n\n"
-                    logger.debug(f"[SSE] Sent event to user {user_id}: {event.get('type', 'unknown')}")
+                    logger.debug("[SSE] Sent event to user %s: %s", user_id, event.get('type', 'unknown'))
                     
                 except queue.Empty:
                     # Send keepalive ping
                     yield f": keepalive\n\n"
                 except Exception as e:
-                    logger.debug(f"[SSE] Error in event stream for user {user_id}: {e}")
+                    logger.debug("[SSE] Error in event stream for user %s: %s", user_id, e)
                     import traceback
                     traceback.print_exc()
                     break
         except GeneratorExit:
-            logger.debug(f"[SSE] Client disconnected (GeneratorExit) for user {user_id}")
+            logger.debug("[SSE] Client disconnected (GeneratorExit) for user %s", user_id)
         except Exception as e:
-            logger.debug(f"[SSE] Unexpected error in event stream for user {user_id}: {e}")
+            logger.debug("[SSE] Unexpected error in event stream for user %s: %s", user_id, e)
             import traceback
             traceback.print_exc()
         finally:
             # Remove connection when client disconnects
             SSEService.remove_connection(user_id, event_queue, connection_type='pdf')
-            logger.debug(f"[SSE] PDF connection closed for user {user_id}")
+            logger.debug("[SSE] PDF connection closed for user %s", user_id)
     
     return Response(
         stream_with_context(event_stream()),
@@ -1075,30 +1205,22 @@ def get_highlight_preview(pdf_id, highlight_id):
     if not user_id:
         return jsonify({'error': 'Unauthorized'}), 401
     
-    # Get PDF document
-    pdf = PDFDocumentModel.get_pdf_document(pdf_id)
-    if not pdf or pdf.get('user_id') != user_id:
+    # Get the PDF (ownership checked in the query) and only the requested highlight in one round trip
+    pdf = PDFDocumentModel.get_highlight_for_user(pdf_id, user_id, highlight_id)
+    if pdf is None:
         return jsonify({'error': 'PDF not found or access denied'}), 404
     
-    # Get highlights from highlights collection
-    file_url = pdf.get('file_url')
-    project_id = pdf.get('project_id')
-    if not file_url:
+    if not pdf.get('file_url'):
         return jsonify({'error': 'PDF has no file_url'}), 404
     
-    highlight_doc = HighlightModel.get_highlights_by_url(user_id, project_id, file_url)
-    if not highlight_doc:
+    highlight = pdf.get('highlight')
+    if not highlight:
         return jsonify({'error': 'Highlight not found'}), 404
     
-    # Find the specific highlight
-    for highlight in highlight_doc.get('highlights', []):
-        if highlight.get('highlight_id') == highlight_id:
-            preview_url = highlight.get('preview_image_url')
-            if preview_url:
-                # Fix URL region if needed
-                preview_url = S3Service.fix_s3_url_region(preview_url, is_pdf_highlight=True)
-                return jsonify({'preview_image_url': preview_url}), 200
-            return jsonify({'error': 'No preview available for this highlight', 'reason': 'preview_image_url field is missing or empty'}), 404
-    
-    return jsonify({'error': 'Highlight not found'}), 404
+    preview_url = highlight.get('preview_image_url')
+    if preview_url:
+        # Fix URL region if needed
+        preview_url = S3Service.fix_s3_url_region(preview_url, is_pdf_highlight=True)
+        return jsonify({'preview_image_url': preview_url}), 200
+    return jsonify({'error': 'No preview available for this highlight', 'reason': 'preview_image_url field is missing or empty'}), 404
 
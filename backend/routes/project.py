@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from models.database import ProjectModel
 from utils.auth import get_user_id_from_token, log_auth_info
 from utils.rate_limiter import get_limiter
+from utils.project_cache import invalidate_project
 
 project_bp = Blueprint('project', __name__)
 
@@ -118,6 +119,7 @@ def update_project():
         
         # Update project
         success = ProjectModel.update_project(project_id, project_name, description)
+        invalidate_project(project_id)
         
         if success:
             return jsonify({
@@ -158,6 +160,7 @@ def delete_project():
         
         # Delete project
         success = ProjectModel.delete_project(project_id)
+        invalidate_project(project_id)
         
         if success:
             return jsonify({
@@ -5,19 +5,22 @@ Handles connection management, caching operations, and error handling.
 import redis
 import json
 import os
+import threading
+import time
+import uuid
 from typing import Optional, Any, List
 from config import Config
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
-
 class RedisService:
     """Redis service for caching with connection pooling and graceful degradation."""
     
     _instance: Optional['RedisService'] = None
     _client: Optional[redis.Redis] = None
     _enabled: bool = False
+    INDEX_TTL = 3600  # Minimum lifetime of set_bytes index sets, in seconds
     
     def __new__(cls):
         if cls._instance is None:
@@ -137,6 +140,60 @@ class RedisService:
             logger.debug(f"[REDIS] Error setting cache for {key}: {e}")
             return False
     
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        """
+        Get a raw cached value (e.g. a pre-serialized JSON response) without decoding it.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached bytes or None if not found
+        """
+        if not self.is_enabled:
+            return None
+
+        try:
+            data = self._client.get(key)
+            logger.debug(f"[REDIS] Cache {'miss' if data is None else 'hit'}: {key}")
+            return data
+        except Exception as e:
+            logger.debug(f"[REDIS] Error getting cache for {key}: {e}")
+            return None
+
+    def set_bytes(self, key: str, value: bytes, ttl: int = 300, index: Optional[str] = None) -> bool:
+        """
+        Set a raw cached value with TTL, stored as-is.
+
+        Args:
+            key: Cache key
+            value: Bytes to cache (e.g. a serialized JSON response body)
+            ttl: Time to live in seconds (default: 300 = 5 minutes)
+            index: Optional index set to record the key in, so unlink_index can drop
+                   every variant of a cache at once without scanning the keyspace
+
+        Returns:
+            True if successful, False otherwise
+        """
+        if not self.is_enabled:
+            return False
+
+        try:
+            if index is None:
+                self._client.setex(key, ttl, value)
+            else:
+                pipe = self._client.pipeline(transaction=False)
+                pipe.setex(key, ttl, value)
+                pipe.sadd(index, key)
+                # Outlive every member; entries for already-expired keys are harmless
+                pipe.expire(index, max(ttl, self.INDEX_TTL))
+                pipe.execute()
+            logger.debug(f"[REDIS] Cache set: {key}, TTL: {ttl}s")
+            return True
+        except Exception as e:
+            logger.debug(f"[REDIS] Error setting cache for {key}: {e}")
+            return False
+
     def delete(self, key: str) -> bool:
         """
         Delete cache entry by key.
@@ -158,11 +215,38 @@ class RedisService:
         except Exception as e:
             logger.debug(f"[REDIS] Error deleting cache for {key}: {e}")
             return False
-    
+
+    def delete_many(self, *keys: str) -> int:
+        """
+        Delete several cache entries in a single pipelined roundtrip.
+
+        Args:
+            *keys: Cache keys
+
+        Returns:
+            Number of keys deleted
+        """
+        if not keys or not self.is_enabled:
+            return 0
+
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            for key in keys:
+                pipe.delete(key)
+            deleted = sum(pipe.execute())
+            if deleted:
+                logger.debug(f"[REDIS] Cache delete_many: {len(keys)} keys, deleted {deleted}")
+            return deleted
+        except Exception as e:
+            # Fall back to one DEL per key so a pipeline failure doesn't leave stale entries
+            logger.debug(f"[REDIS] Pipelined delete failed for {keys}, retrying one by one: {e}")
+            return sum(self.delete(key) for key in keys)
+
     def delete_pattern(self, pattern: str) -> int:
         """
         Delete all keys matching pattern.
-        Use with caution in production!
+        Iterates client-side with SCAN (each step is short, so Redis never blocks on a
+        full keyspace walk) and UNLINKs each page of matches in one pipelined roundtrip.
         
         Args:
             pattern: Redis key pattern (e.g., "cache:documents:*")
@@ -174,16 +258,131 @@ class RedisService:
             return 0
         
         try:
-            keys = self._client.keys(pattern)
-            if keys:
-                deleted = self._client.delete(*keys)
-                logger.debug(f"[REDIS] Cache delete_pattern: {pattern}, deleted {deleted} keys")
-                return deleted
-            return 0
+            deleted = 0
+            batch = []
+            for key in self._client.scan_iter(match=pattern, count=1000):
+                batch.append(key)
+                if len(batch) >= 1000:
+                    deleted += self._client.unlink(*batch)
+                    batch = []
+            if batch:
+                deleted += self._client.unlink(*batch)
+            if deleted:
+                logger.debug(f"[REDIS] Cache delete pattern: {pattern}, deleted {deleted} keys")
+            return deleted
         except Exception as e:
             logger.debug(f"[REDIS] Error deleting cache pattern {pattern}: {e}")
             return 0
     
+    def unlink_index(self, index: str, *keys: str) -> int:
+        """
+        Unlink every key recorded in an index set (see set_bytes), plus any explicitly
+        named keys. Reads the set, then UNLINKs its members in one pipelined roundtrip;
+        each step is O(members), never a keyspace walk.
+
+        Args:
+            index: Index set key (e.g., "index:highlights:{user_id}:{project_id}")
+            *keys: Additional exact keys to unlink
+
+        Returns:
+            Number of keys unlinked
+        """
+        if not self.is_enabled:
+            return 0
+
+        try:
+            members = self._client.smembers(index)
+            pipe = self._client.pipeline(transaction=False)
+            if members:
+                pipe.unlink(*members)
+                # Only drop the members we read; keys cached meanwhile stay indexed
+                pipe.srem(index, *members)
+            if keys:
+                pipe.unlink(*keys)
+            results = pipe.execute()
+            # UNLINK results sit at 0 (members) and -1 (keys); SREM's is in between
+            deleted = (results[0] if members else 0) + (results[-1] if keys else 0)
+            if deleted:
+                logger.debug(f"[REDIS] Cache unlink_index: {index}, unlinked {deleted} keys")
+            return deleted
+        except Exception as e:
+            logger.debug(f"[REDIS] Error unlinking cache index {index}: {e}")
+            return 0
+
+    def get_or_create_token(self, key: str, ttl: int = 300) -> Optional[str]:
+        """
+        Get the version token stored at key, creating a random one if absent.
+        Deleting the key invalidates the token; the next call mints a new one.
+        
+        Args:
+            key: Token key
+            ttl: Time to live in seconds for a newly created token
+            
+        Returns:
+            Token string, or None if Redis is unavailable
+        """
+        if not self.is_enabled:
+            return None
+        
+        try:
+            token = uuid.uuid4().hex
+            # SET NX so concurrent callers agree on a single token
+            if self._client.set(key, token, nx=True, ex=ttl):
+                return token
+            existing = self._client.get(key)
+            return existing.decode('utf-8') if existing else None
+        except Exception as e:
+            logger.debug(f"[REDIS] Error getting token for {key}: {e}")
+            return None
+    
+    def publish(self, channel: str, message: Any) -> bool:
+        """
+        Publish a message on a pub/sub channel.
+
+        Args:
+            channel: Channel name
+            message: str or bytes payload
+
+        Returns:
+            True if published, False otherwise (Redis unavailable)
+        """
+        if not self.is_enabled:
+            return False
+
+        try:
+            self._client.publish(channel, message)
+            return True
+        except Exception as e:
+            logger.debug(f"[REDIS] Error publishing to {channel}: {e}")
+            return False
+
+    def subscribe(self, channel: str, handler) -> Optional[threading.Thread]:
+        """
+        Subscribe to a pub/sub channel on a background daemon thread.
+
+        Args:
+            channel: Channel name
+            handler: Called with each message dict (payload under 'data', as bytes)
+
+        Returns:
+            The listener thread, or None if Redis is unavailable
+        """
+        if not self.is_enabled:
+            return None
+
+        def on_error(e, pubsub, thread):
+            # Keep listening; the pubsub connection reconnects on the next read
+            logger.warning(f"[REDIS] Pub/sub listener error on {channel}: {e}")
+            time.sleep(1)
+
+        try:
+            pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{channel: handler})
+            return pubsub.run_in_thread(sleep_time=1.0, daemon=True, exception_handler=on_error)
+        except Exception as e:
+            logger.warning(f"[REDIS] Error subscribing to {channel}: {e}")
+            return None
+
     def exists(self, key: str) -> bool:
         """
         Check if key exists in cache.
@@ -10,6 +10,7 @@ This service handles:
 
 import os
 import sys
+from functools import lru_cache
 
 # Add parent directory to path for imports
 parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -132,10 +133,14 @@ class S3Service:
             return None
     
     @classmethod
+    @lru_cache(maxsize=4096)
     def fix_s3_url_region(cls, url, is_pdf_highlight=False):
         """
         Fix an S3 URL to use the correct region.
         
+        Memoized per URL: the result depends only on the URL and the configured region, and
+        preview URLs repeat across requests.
+        
         Uses the configured region (Config.AWS_S3_REGION) as the authoritative source.
         Only attempts verification if the URL's region doesn't match the configured region.
         
@@ -271,12 +276,13 @@ class S3Service:
         return BOTO3_AVAILABLE and Config.is_s3_configured() and cls.get_client() is not None
     
     @classmethod
-    def upload_highlight_image(cls, image_bytes, user_id, highlight_id):
+    def upload_highlight_image(cls, image, user_id, highlight_id):
         """
         Upload a highlight preview image to S3.
         
         Args:
-            image_bytes: The JPEG image data as bytes
+            image: The JPEG image data, as bytes or a binary file object positioned at
+                the start (e.g. a BytesIO, which is streamed without copying)
             user_id: User ID for organizing files
             highlight_id: Unique highlight ID for the filename
         
@@ -296,14 +302,17 @@ class S3Service:
             client.put_object(
                 Bucket=Config.AWS_S3_BUCKET_NAME,
                 Key=s3_key,
-                Body=image_bytes,
+                Body=image,
                 ContentType='image/jpeg',
                 CacheControl='max-age=31536000'  # Cache for 1 year (images don't change)
             )
             
-            # Generate the public URL using the actual bucket region
+            # Generate the public URL using the actual bucket region, normalized once here so
+            # stored URLs never need fix_s3_url_region on read
             bucket_region = cls.get_bucket_region() or Config.AWS_S3_REGION
-            url = f"https://{Config.AWS_S3_BUCKET_NAME}.s3.{bucket_region}.amazonaws.com/{s3_key}"
+            url = cls.fix_s3_url_region(
+                f"https://{Config.AWS_S3_BUCKET_NAME}.s3.{bucket_region}.amazonaws.com/{s3_key}"
+            )
             
             logger.debug(f"[S3] Successfully uploaded highlight image: {s3_key}")
             return url
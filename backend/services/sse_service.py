@@ -3,6 +3,10 @@ Server-Sent Events (SSE) Service for real-time notifications.
 
 This service manages SSE connections and broadcasts events to connected clients.
 Used for notifying frontend when PDF extraction completes.
+
+Connections live in the worker process that accepted them, so broadcasts are published on
+a Redis channel that every worker listens to; each worker delivers to its own connections.
+Without Redis, broadcasts are delivered in-process only.
 """
 
 import json
@@ -13,12 +17,37 @@ from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+BROADCAST_CHANNEL = 'sse:broadcast'
+
 
 class SSEService:
     """Service for managing SSE connections and broadcasting events."""
     
     _connections: Dict[str, Dict[str, Set]] = {}  # user_id -> {connection_type -> set of connection queues}
     _lock = Lock()
+    _listener = None  # Per-process Redis pub/sub listener thread
+    _listener_lock = Lock()
+    
+    @classmethod
+    def _ensure_listener(cls):
+        """Start this process's Redis listener on first connection (after fork, not at import)."""
+        if cls._listener is not None and cls._listener.is_alive():
+            return
+        with cls._listener_lock:
+            if cls._listener is not None and cls._listener.is_alive():
+                return
+            from services.redis_service import get_redis_service
+            cls._listener = get_redis_service().subscribe(BROADCAST_CHANNEL, cls._on_broadcast_message)
+    
+    @classmethod
+    def _on_broadcast_message(cls, message):
+        """Deliver a broadcast published by any worker to this process's connections."""
+        try:
+            event = json.loads(message['data'])
+        except (TypeError, ValueError) as e:
+            logger.warning(f"[SSE] Dropping malformed broadcast message: {e}")
+            return
+        cls._deliver(event['user_id'], event['event_data'], event.get('connection_type'))
     
     @classmethod
     def add_connection(cls, user_id: str, queue, connection_type: str = 'default'):
@@ -29,6 +58,7 @@ class SSEService:
             queue: Queue for this connection
             connection_type: Type of connection ('agent_steps', 'pdf', 'default')
         """
+        cls._ensure_listener()
         with cls._lock:
             if user_id not in cls._connections:
                 cls._connections[user_id] = {}
@@ -63,6 +93,30 @@ class SSEService:
                            'agent_step' events go to 'agent_steps' connections.
                            PDF/extraction events go to 'pdf' connections.
         """
+        event_data = {
+            'type': event_type,
+            'data': data,
+            'timestamp': time.time()
+        }
+        
+        # Always fan out through Redis: the user's connections usually live in another worker
+        # (this one may hold none and so never started a listener). Our own listener, when
+        # running, delivers to this process's connections; otherwise deliver them directly
+        from services.redis_service import get_redis_service
+        message = json.dumps(
+            {'user_id': user_id, 'event_data': event_data, 'connection_type': connection_type},
+            default=str
+        )
+        if get_redis_service().publish(BROADCAST_CHANNEL, message):
+            if cls._listener is not None and cls._listener.is_alive():
+                return
+        
+        cls._deliver(user_id, event_data, connection_type)
+    
+    @classmethod
+    def _deliver(cls, user_id: str, event_data: dict, connection_type: str = None):
+        """Put an event on this process's matching connection queues for a user."""
+        event_type = event_data['type']
         with cls._lock:
             if user_id not in cls._connections:
                 logger.debug(f"[SSE] No connections for user {user_id}, skipping broadcast")
@@ -76,19 +130,13 @@ class SSEService:
             elif event_type == 'agent_step':
                 # Agent steps go to agent_steps connections
                 target_types = ['agent_steps']
-            elif event_type in ['extraction_started', 'extraction_complete', 'extraction_failed', 'highlight_saved']:
+            elif event_type in ['extraction_started', 'extraction_complete', 'extraction_failed', 'highlight_saved', 'preview_ready']:
                 # PDF events go to pdf connections
                 target_types = ['pdf']
             else:
                 # Default: send to all connection types
                 target_types = list(cls._connections[user_id].keys())
             
-            event_data = {
-                'type': event_type,
-                'data': data,
-                'timestamp': time.time()
-            }
-            
             # Send to target connection types
             total_sent = 0
             disconnected = []
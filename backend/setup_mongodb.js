@@ -38,6 +38,18 @@ db.document_types.createIndex({ "type_name": 1 }, { unique: true })
 db.document_types.createIndex({ "usage_count": -1 })
 db.document_types.createIndex({ "is_system": 1 })
 
+// Create highlights collection (one document per user + project + source URL)
+// Unique index makes get_highlights_by_url a single-document point lookup; dedupe existing
+// (user_id, project_id, source_url) duplicates before creating it on an existing database
+db.createCollection("highlights")
+db.highlights.createIndex({ "user_id": 1, "project_id": 1, "source_url": 1 }, { unique: true })
+db.highlights.createIndex({ "user_id": 1, "project_id": 1, "updated_at": -1 })
+
+// Create pdf_documents collection
+// Bounds the PDF half of highlight search (and project PDF listings) to one project's documents
+db.createCollection("pdf_documents")
+db.pdf_documents.createIndex({ "user_id": 1, "project_id": 1, "updated_at": -1 })
+
 // Verify setup
 print("Collections created:")
 show collections
@@ -5,8 +5,12 @@ This module handles Auth0 token validation and user identification.
 All authentication now goes through Auth0.
 """
 
+import hashlib
 import os
 import sys
+import threading
+import time
+from cachetools import TTLCache
 from flask import request
 
 # Add parent directory to path for imports
@@ -20,6 +24,11 @@ from utils.logger import get_logger, log_error, log_security_event
 
 logger = get_logger(__name__)
 
+# Recently validated tokens: blake2b(token) -> (user_id, token exp). Skips the signature check
+# and user lookup for a token seen in the last minute; an entry never outlives the token's exp.
+_token_users = TTLCache(maxsize=10000, ttl=60)
+_token_users_lock = threading.Lock()
+
 
 def get_token_from_header():
     """
@@ -60,6 +69,8 @@ def get_user_id_from_token():
     3. Looks up the user in MongoDB by auth0_id
     4. Returns the internal user_id
     
+    Successful lookups are cached per token for up to a minute (never past the token's exp).
+    
     Returns:
         str: The internal user_id, or None if authentication fails
     """
@@ -67,6 +78,12 @@ def get_user_id_from_token():
     if not token:
         return None
     
+    token_key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    with _token_users_lock:
+        cached = _token_users.get(token_key)
+    if cached and cached[1] > time.time():
+        return cached[0]
+    
     try:
         # Validate token with Auth0
         payload = validate_token(token)
@@ -85,7 +102,10 @@ def get_user_id_from_token():
         user = UserModel.get_user_by_auth0_id(auth0_id)
         
         if user:
-            return user.get('user_id')
+            user_id = user.get('user_id')
+            with _token_users_lock:
+                _token_users[token_key] = (user_id, payload.get('exp') or float('inf'))
+            return user_id
         
         # User not found - they need to sync first via /api/auth/sync
         logger.warning(f"User with auth0_id {auth0_id} not found in database")
@@ -0,0 +1,28 @@
+"""
+Highlight Cache Invalidation
+
+Redis keys for the cached highlight list/search responses (get_highlights, search_highlights)
+and their weak-ETag token. Both web highlights and PDF highlights live in the highlights
+collection and show up in those responses, so every route that writes to it (highlight and
+PDF routes alike, including PDF extraction) calls invalidate_highlight_caches.
+"""
+
+from services.redis_service import get_redis_service
+
+
+def highlights_index_key(user_id, project_id):
+    """Index set recording every cached list/search variant for a project (see set_bytes)."""
+    return f"index:highlights:{user_id}:{project_id}"
+
+
+def highlights_etag_key(user_id, project_id):
+    """Weak-ETag version token for a project's highlight list."""
+    return f"etag:highlights:{user_id}:{project_id}"
+
+
+def invalidate_highlight_caches(user_id, project_id):
+    """Drop every cached highlight list/search variant and the ETag token for a project."""
+    return get_redis_service().unlink_index(
+        highlights_index_key(user_id, project_id),
+        highlights_etag_key(user_id, project_id),
+    )
@@ -0,0 +1,28 @@
+"""
+JSON Response Utility
+
+orjson-backed replacements for jsonify. Naive datetimes (as returned by MongoDB) are
+written as UTC ISO 8601 with a 'Z' suffix, and anything orjson can't serialize natively
+(e.g. ObjectId) falls back to str(). Pass option=0 to keep naive datetimes as plain
+isoformat() output, for endpoints that have always returned them that way.
+"""
+
+import orjson
+from flask import current_app
+
+JSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
+
+def dumps(data, option=JSON_OPTIONS):
+    """Serialize data to JSON bytes."""
+    return orjson.dumps(data, default=str, option=option)
+
+
+def json_bytes_response(body, status=200):
+    """Wrap an already-serialized JSON body (e.g. straight from Redis) in a response."""
+    return current_app.response_class(body, status=status, mimetype='application/json')
+
+
+def ojsonify(data, status=200, option=JSON_OPTIONS):
+    """Serialize data with orjson and return it as a JSON response."""
+    return json_bytes_response(dumps(data, option), status)
@@ -6,14 +6,19 @@ This module provides:
 - Human-readable formatting for development
 - Automatic sanitization of sensitive data
 - File rotation and console logging
+- Queue-based emission so file/console I/O happens off the request thread
 - Security event logging
 """
 
 import os
 import json
 import logging
+import queue
 import re
-from logging.handlers import RotatingFileHandler
+import atexit
+import copy
+import threading
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from pathlib import Path
 from typing import Any, Dict, Optional
 from flask import request, g
@@ -138,6 +143,8 @@ class ContextFilter(logging.Filter):
         context = get_request_context(skip_user_lookup=True)
         for key, value in context.items():
             setattr(record, key, value)
+        # Keep the captured context for formatters, which run on the listener thread
+        record.request_context = context
         # Set default values for formatter fields that might not exist
         if not hasattr(record, 'ip'):
             record.ip = 'N/A'
@@ -162,7 +169,10 @@ class JSONFormatter(logging.Formatter):
         
         # Add request context (skip user lookup to prevent circular dependency)
         # user_id will be added via extra fields if available
-        context = get_request_context(skip_user_lookup=True)
+        # Prefer the context captured by ContextFilter on the request thread
+        context = getattr(record, 'request_context', None)
+        if context is None:
+            context = get_request_context(skip_user_lookup=True)
         if context:
             log_data['context'] = context
         
@@ -175,34 +185,15 @@ class JSONFormatter(logging.Formatter):
             if key not in ['name', 'msg', 'args', 'created', 'filename', 'funcName',
                           'levelname', 'levelno', 'lineno', 'module', 'msecs',
                           'message', 'pathname', 'process', 'processName', 'relativeCreated',
-                          'thread', 'threadName', 'exc_info', 'exc_text', 'stack_info']:
+                          'thread', 'threadName', 'exc_info', 'exc_text', 'stack_info',
+                          'request_context']:
                 log_data[key] = sanitize_data(value)
         
         return json.dumps(log_data, default=str)
 
 
-def get_logger(name: str = __name__) -> logging.Logger:
-    """
-    Get a configured logger instance.
-    
-    Args:
-        name: Logger name (typically __name__ of the calling module)
-        
-    Returns:
-        Configured logger instance
-    """
-    logger = logging.getLogger(name)
-    
-    # Avoid duplicate handlers
-    if logger.handlers:
-        return logger
-    
-    # Set log level based on environment
-    if Config.IS_PRODUCTION:
-        logger.setLevel(logging.INFO)
-    else:
-        logger.setLevel(logging.DEBUG)
-    
+def _build_handlers():
+    """Create the file and console handlers shared by all application loggers."""
     # Create logs directory if it doesn't exist
     logs_dir = Path(__file__).parent.parent / 'logs'
     logs_dir.mkdir(exist_ok=True)
@@ -257,14 +248,81 @@ def get_logger(name: str = __name__) -> logging.Logger:
         file_handler.setLevel(logging.DEBUG)
         console_handler.setLevel(logging.DEBUG)
     
-    # Add context filter
-    context_filter = ContextFilter()
-    file_handler.addFilter(context_filter)
-    console_handler.addFilter(context_filter)
+    return file_handler, console_handler
+
+
+class _LocalQueueHandler(QueueHandler):
+    """
+    QueueHandler for an in-process queue that keeps exception and stack info.
+    
+    The stdlib prepare() bakes the formatted traceback into msg and clears exc_info, so the
+    listener-side JSONFormatter could never emit its structured 'exception' field. Records
+    never leave the process here, so only the message is rendered eagerly (args may be
+    mutated after the call); exc_info and stack_info are left for the listener to format.
+    """
+    
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+
+_log_queue = None
+_queue_listener = None
+_queue_lock = threading.Lock()
+
+
+def _get_log_queue():
+    """
+    Get the process-wide log queue, starting its listener on first use.
+    
+    Records are enqueued on the calling thread and written to the file/console
+    handlers by a background QueueListener, so request threads never block on log I/O.
+    """
+    global _log_queue, _queue_listener
+    with _queue_lock:
+        if _queue_listener is None:
+            _log_queue = queue.SimpleQueue()
+            file_handler, console_handler = _build_handlers()
+            _queue_listener = QueueListener(
+                _log_queue, file_handler, console_handler, respect_handler_level=True
+            )
+            _queue_listener.start()
+            # Flush anything still queued on interpreter shutdown
+            atexit.register(_queue_listener.stop)
+    return _log_queue
+
+
+def get_logger(name: str = __name__) -> logging.Logger:
+    """
+    Get a configured logger instance.
+    
+    Args:
+        name: Logger name (typically __name__ of the calling module)
+        
+    Returns:
+        Configured logger instance
+    """
+    logger = logging.getLogger(name)
+    
+    # Avoid duplicate handlers
+    if logger.handlers:
+        return logger
+    
+    # Set log level based on environment
+    if Config.IS_PRODUCTION:
+        logger.setLevel(logging.INFO)
+    else:
+        logger.setLevel(logging.DEBUG)
+    
+    queue_handler = _LocalQueueHandler(_get_log_queue())
+    
+    # Add context filter (runs on the request thread, before the record is enqueued)
+    queue_handler.addFilter(ContextFilter())
     
-    # Add handlers to logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    logger.addHandler(queue_handler)
     
     return logger
 
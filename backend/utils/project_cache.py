@@ -0,0 +1,41 @@
+"""
+Project Ownership Cache
+
+Short-lived in-process cache of confirmed project ownership, shared by the routes that
+check it on every request. Maps project_id to its owner's user_id and nothing else, so a
+stale entry can't leak project data.
+
+Ownership never changes after creation, so a 60s TTL only risks serving a just-deleted
+project; routes that delete projects call invalidate_project. Only positive results are
+cached, so a freshly created project is never reported missing.
+"""
+
+import threading
+
+from cachetools import TTLCache
+
+from models.database import ProjectModel
+
+_owners = TTLCache(maxsize=10000, ttl=60)
+_owners_lock = threading.Lock()
+
+
+def project_belongs_to(project_id, user_id):
+    """Return True if project_id exists and is owned by user_id."""
+    with _owners_lock:
+        owner = _owners.get(project_id)
+    if owner is not None:
+        return owner == user_id
+
+    if not ProjectModel.project_belongs_to(project_id, user_id):
+        return False
+
+    with _owners_lock:
+        _owners[project_id] = user_id
+    return True
+
+
+def invalidate_project(project_id):
+    """Drop a project from the ownership cache (call on project update/delete)."""
+    with _owners_lock:
+        _owners.pop(project_id, None)
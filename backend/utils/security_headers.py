@@ -5,15 +5,22 @@ Provides environment-aware security headers for Flask responses.
 Strict in production, relaxed in development.
 """
 
+from functools import lru_cache
+from types import MappingProxyType
+
 from config import Config
 
 
+@lru_cache(maxsize=None)
 def get_security_headers():
     """
     Get security headers based on environment.
     
+    Headers depend only on Config, which is fixed at startup, so they are built
+    once and the same read-only mapping is returned for every response.
+    
     Returns:
-        dict: Dictionary of security headers to add to responses
+        Mapping of security headers to add to responses
     """
     headers = {}
     
@@ -24,7 +31,7 @@ def get_security_headers():
         # Development: Relaxed headers for easier debugging
         headers.update(_get_development_headers())
     
-    return headers
+    return MappingProxyType(headers)
 
 
 def _get_production_headers():
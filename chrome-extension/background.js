@@ -261,10 +261,10 @@ async function captureHighlightPreview(tabId, selectionRect) {
     console.log('Selection rect:', selectionRect);
     console.log('Viewport dimensions:', selectionRect.viewport_width, 'x', selectionRect.viewport_height);
     
-    // Capture visible tab as PNG
+    // Capture visible tab as JPEG (the backend can decode JPEG at reduced scale, which is much faster than PNG)
     // Note: This requires <all_urls> host permission or activeTab permission
     // captureVisibleTab captures the full visible viewport of the active tab
-    const dataUrl = await chrome.tabs.captureVisibleTab(null, { format: 'png' });
+    const dataUrl = await chrome.tabs.captureVisibleTab(null, { format: 'jpeg', quality: 92 });
     
     if (!dataUrl) {
       console.error('captureVisibleTab returned empty result');
@@ -275,7 +275,6 @@ async function captureHighlightPreview(tabId, selectionRect) {
     try {
       const base64Data = dataUrl.split(',')[1];
       const imgBytes = atob(base64Data);
-      // PNG header is 8 bytes, then IHDR chunk with width/height (4 bytes each, big-endian)
       // For quick check, we can decode a small portion
       console.log('Screenshot captured successfully, data URL length:', dataUrl.length);
       console.log('Base64 data length:', base64Data.length);
@@ -295,6 +294,7 @@ async function captureHighlightPreview(tabId, selectionRect) {
     // The backend will verify dimensions match viewport
     return {
       screenshot: base64Data,
+      mime: 'image/jpeg',
       selection_rect: selectionRect
     };
   } catch (error) {
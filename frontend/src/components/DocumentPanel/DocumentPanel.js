@@ -372,9 +372,9 @@ const DocumentPanel = ({ refreshTrigger, selectedProjectId: propSelectedProjectI
               ? { ...pdf, extraction_status: 'processing' }
               : pdf
           ));
-        } else if (data.type === 'highlight_saved') {
-          // Highlight saved - refresh highlights list immediately
-          console.log('[SSE] Highlight saved for project:', data.data.project_id);
+        } else if (data.type === 'highlight_saved' || data.type === 'preview_ready') {
+          // Highlight saved (or its preview image became available) - refresh highlights list immediately
+          console.log('[SSE] Highlight ' + (data.type === 'preview_ready' ? 'preview ready' : 'saved') + ' for project:', data.data.project_id);
           if (selectedProjectId && selectedProjectId === data.data.project_id) {
             // Invalidate localStorage cache to ensure fresh data
             const cacheKey = getCacheKey('highlights', selectedProjectId);